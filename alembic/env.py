@@ -1,5 +1,6 @@
 from logging.config import fileConfig
 import os
+import re
 
 from alembic import context
 from sqlalchemy import engine_from_config, pool
@@ -14,6 +15,15 @@ if config.config_file_name is not None:
 
 target_metadata = Base.metadata
 
+# Monthly auth_events partitions are created at runtime by app.partitions, not by migrations.
+PARTITION_TABLE_RE = re.compile(r"^auth_events_p\d{4}_\d{2}$")
+
+
+def include_name(name, type_, parent_names) -> bool:
+    if type_ == "table":
+        return not PARTITION_TABLE_RE.match(name)
+    return True
+
 
 def get_database_url() -> str:
     database_url = os.getenv("DATABASE_URL")
@@ -34,6 +44,7 @@ def run_migrations_offline() -> None:
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
         compare_type=True,
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -54,6 +65,7 @@ def run_migrations_online() -> None:
             connection=connection,
             target_metadata=target_metadata,
             compare_type=True,
+            include_name=include_name,
         )
 
         with context.begin_transaction():
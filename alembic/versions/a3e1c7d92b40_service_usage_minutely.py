@@ -0,0 +1,40 @@
+"""service usage minutely
+
+Revision ID: a3e1c7d92b40
+Revises: 7a2b1c4d8f01
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "a3e1c7d92b40"
+down_revision = "7a2b1c4d8f01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "service_usage_minutely",
+        sa.Column("service_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("route", sa.String(), nullable=False),
+        sa.Column("minute", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("request_count", sa.Integer(), nullable=False),
+        sa.Column("error_count", sa.Integer(), nullable=False),
+        sa.Column("total_duration_ms", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["service_id"], ["services.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("service_id", "route", "minute"),
+    )
+    op.create_index(
+        op.f("ix_service_usage_minutely_minute"),
+        "service_usage_minutely",
+        ["minute"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_service_usage_minutely_minute"), table_name="service_usage_minutely")
+    op.drop_table("service_usage_minutely")
@@ -0,0 +1,28 @@
+"""refresh token families for reuse detection
+
+Revision ID: a8d3b5e1f649
+Revises: f7c2a9d4e538
+Create Date: 2026-10-18 00:00:06.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "a8d3b5e1f649"
+down_revision = "f7c2a9d4e538"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("refresh_tokens", sa.Column("family_id", postgresql.UUID(as_uuid=True), nullable=True))
+    # Existing tokens were never linked to their predecessors, so each starts its own family.
+    op.execute("UPDATE refresh_tokens SET family_id = id")
+    op.alter_column("refresh_tokens", "family_id", nullable=False)
+    op.create_index(op.f("ix_refresh_tokens_family_id"), "refresh_tokens", ["family_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_refresh_tokens_family_id"), table_name="refresh_tokens")
+    op.drop_column("refresh_tokens", "family_id")
@@ -0,0 +1,122 @@
+"""partition auth_events by month
+
+Revision ID: b7d2f4a6c813
+Revises: a3e1c7d92b40
+Create Date: 2026-10-18 00:00:01.000000
+"""
+
+from datetime import datetime, timezone
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "b7d2f4a6c813"
+down_revision = "a3e1c7d92b40"
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+
+def _month_start(dt: datetime) -> datetime:
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(dt: datetime, months: int) -> datetime:
+    year = dt.year + (dt.month - 1 + months) // 12
+    month = (dt.month - 1 + months) % 12 + 1
+    return dt.replace(year=year, month=month)
+
+
+def _create_auth_events_table(name: str, primary_key: list[str], **kwargs) -> None:
+    op.create_table(
+        name,
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("event_type", sa.String(), nullable=False),
+        sa.Column("ip_address", sa.String(), nullable=True),
+        sa.Column("service_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable="created_at" not in primary_key,
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(
+            ["service_id"],
+            ["services.id"],
+            name="fk_auth_events_service_id_services",
+            ondelete="SET NULL",
+        ),
+        sa.PrimaryKeyConstraint(*primary_key, name="auth_events_pkey"),
+        **kwargs,
+    )
+
+
+def _create_indexes(table: str) -> None:
+    op.create_index("ix_auth_events_id", table, ["id"], unique=False)
+    op.create_index("ix_auth_events_user_id", table, ["user_id"], unique=False)
+    op.create_index("ix_auth_events_created_at", table, ["created_at"], unique=False)
+
+
+def _drop_indexes(table: str) -> None:
+    op.drop_index("ix_auth_events_created_at", table_name=table)
+    op.drop_index("ix_auth_events_user_id", table_name=table)
+    op.drop_index("ix_auth_events_id", table_name=table)
+
+
+def upgrade() -> None:
+    _drop_indexes("auth_events")
+    op.rename_table("auth_events", "auth_events_legacy")
+    op.execute("ALTER TABLE auth_events_legacy RENAME CONSTRAINT auth_events_pkey TO auth_events_legacy_pkey")
+
+    _create_auth_events_table(
+        "auth_events",
+        primary_key=["id", "created_at"],
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    _create_indexes("auth_events")
+
+    now_month = _month_start(datetime.now(timezone.utc))
+    first_month = now_month
+    if not context.is_offline_mode():
+        oldest = op.get_bind().execute(sa.text("SELECT min(created_at) FROM auth_events_legacy")).scalar()
+        if oldest is not None:
+            first_month = min(first_month, _month_start(oldest.astimezone(timezone.utc)))
+
+    month = first_month
+    last_month = _add_months(now_month, MONTHS_AHEAD)
+    while month <= last_month:
+        end = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE auth_events_p{month.year:04d}_{month.month:02d} PARTITION OF auth_events "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        month = end
+
+    op.execute(
+        "INSERT INTO auth_events (id, user_id, event_type, ip_address, service_id, created_at) "
+        "SELECT id, user_id, event_type, ip_address, service_id, COALESCE(created_at, now()) "
+        "FROM auth_events_legacy"
+    )
+    op.drop_table("auth_events_legacy")
+
+
+def downgrade() -> None:
+    _drop_indexes("auth_events")
+    op.rename_table("auth_events", "auth_events_partitioned")
+    op.execute(
+        "ALTER TABLE auth_events_partitioned RENAME CONSTRAINT auth_events_pkey TO auth_events_partitioned_pkey"
+    )
+
+    _create_auth_events_table("auth_events", primary_key=["id"])
+    _create_indexes("auth_events")
+
+    op.execute(
+        "INSERT INTO auth_events (id, user_id, event_type, ip_address, service_id, created_at) "
+        "SELECT id, user_id, event_type, ip_address, service_id, created_at "
+        "FROM auth_events_partitioned"
+    )
+    op.drop_table("auth_events_partitioned")
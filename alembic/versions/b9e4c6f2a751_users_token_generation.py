@@ -0,0 +1,26 @@
+"""per-user token generation for revoking all sessions
+
+Revision ID: b9e4c6f2a751
+Revises: a8d3b5e1f649
+Create Date: 2026-10-18 00:00:07.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "b9e4c6f2a751"
+down_revision = "a8d3b5e1f649"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # A constant default is stored in the catalog, so existing rows are not rewritten.
+    op.add_column(
+        "users",
+        sa.Column("token_generation", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "token_generation")
@@ -0,0 +1,52 @@
+"""dashboard rollup tables
+
+Revision ID: c4f8a2e6d195
+Revises: b7d2f4a6c813
+Create Date: 2026-10-18 00:00:02.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "c4f8a2e6d195"
+down_revision = "b7d2f4a6c813"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "auth_event_daily_counts",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("service_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("event_type", sa.String(), nullable=False),
+        sa.Column("count", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "service_id", "event_type"),
+    )
+    op.create_table(
+        "daily_entity_counts",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("entity", sa.String(), nullable=False),
+        sa.Column("created", sa.BigInteger(), nullable=False),
+        sa.Column("deleted", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "entity"),
+    )
+
+    op.execute(
+        "INSERT INTO auth_event_daily_counts (day, service_id, event_type, count) "
+        "SELECT (created_at AT TIME ZONE 'UTC')::date, "
+        "COALESCE(service_id, '00000000-0000-0000-0000-000000000000'::uuid), event_type, count(*) "
+        "FROM auth_events GROUP BY 1, 2, 3"
+    )
+    for entity in ("users", "services", "service_api_keys"):
+        op.execute(
+            "INSERT INTO daily_entity_counts (day, entity, created, deleted) "
+            f"SELECT (COALESCE(created_at, now()) AT TIME ZONE 'UTC')::date, '{entity}', count(*), 0 "
+            f"FROM {entity} GROUP BY 1"
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("daily_entity_counts")
+    op.drop_table("auth_event_daily_counts")
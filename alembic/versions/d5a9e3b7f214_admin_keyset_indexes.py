@@ -0,0 +1,51 @@
+"""composite indexes for admin keyset pagination
+
+Revision ID: d5a9e3b7f214
+Revises: c4f8a2e6d195
+Create Date: 2026-10-18 00:00:03.000000
+"""
+
+from alembic import op
+
+revision = "d5a9e3b7f214"
+down_revision = "c4f8a2e6d195"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_users_created_at_id", "users", ["created_at", "id"], unique=False)
+
+    # The (user_id, created_at, id) and (created_at, id) indexes supersede the single-column ones.
+    op.drop_index("ix_auth_events_user_id", table_name="auth_events")
+    op.drop_index("ix_auth_events_created_at", table_name="auth_events")
+    op.create_index("ix_auth_events_created_at_id", "auth_events", ["created_at", "id"], unique=False)
+    op.create_index(
+        "ix_auth_events_user_id_created_at_id",
+        "auth_events",
+        ["user_id", "created_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_auth_events_service_id_created_at_id",
+        "auth_events",
+        ["service_id", "created_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_auth_events_event_type_created_at_id",
+        "auth_events",
+        ["event_type", "created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_auth_events_event_type_created_at_id", table_name="auth_events")
+    op.drop_index("ix_auth_events_service_id_created_at_id", table_name="auth_events")
+    op.drop_index("ix_auth_events_user_id_created_at_id", table_name="auth_events")
+    op.drop_index("ix_auth_events_created_at_id", table_name="auth_events")
+    op.create_index("ix_auth_events_created_at", "auth_events", ["created_at"], unique=False)
+    op.create_index("ix_auth_events_user_id", "auth_events", ["user_id"], unique=False)
+
+    op.drop_index("ix_users_created_at_id", table_name="users")
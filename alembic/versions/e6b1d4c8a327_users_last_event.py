@@ -0,0 +1,43 @@
+"""denormalized last auth event on users
+
+Revision ID: e6b1d4c8a327
+Revises: d5a9e3b7f214
+Create Date: 2026-10-18 00:00:04.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "e6b1d4c8a327"
+down_revision = "d5a9e3b7f214"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("last_event_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("users", sa.Column("last_event_type", sa.String(), nullable=True))
+    op.add_column("users", sa.Column("last_service_id", postgresql.UUID(as_uuid=True), nullable=True))
+    op.create_foreign_key(
+        "fk_users_last_service_id_services",
+        "users",
+        "services",
+        ["last_service_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+    op.execute(
+        "UPDATE users SET last_event_at = latest.created_at, last_event_type = latest.event_type, "
+        "last_service_id = latest.service_id "
+        "FROM (SELECT DISTINCT ON (user_id) user_id, created_at, event_type, service_id "
+        "FROM auth_events ORDER BY user_id, created_at DESC, id DESC) AS latest "
+        "WHERE users.id = latest.user_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("fk_users_last_service_id_services", "users", type_="foreignkey")
+    op.drop_column("users", "last_service_id")
+    op.drop_column("users", "last_event_type")
+    op.drop_column("users", "last_event_at")
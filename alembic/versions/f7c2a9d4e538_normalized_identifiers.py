@@ -0,0 +1,63 @@
+"""normalized email and E.164 phone lookup keys on users
+
+Revision ID: f7c2a9d4e538
+Revises: e6b1d4c8a327
+Create Date: 2026-10-18 00:00:05.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "f7c2a9d4e538"
+down_revision = "e6b1d4c8a327"
+branch_labels = None
+depends_on = None
+
+# Mirrors app.identifiers.normalize_phone: drop separators, "00" prefix becomes "+", then require E.164.
+PHONE_CLEANED = r"regexp_replace(phone, '[\s\-().]', '', 'g')"
+PHONE_E164 = (
+    f"CASE WHEN {PHONE_CLEANED} LIKE '00%' THEN '+' || substr({PHONE_CLEANED}, 3) ELSE {PHONE_CLEANED} END"
+)
+
+
+def _backfill(column: str, expression: str, valid: str) -> None:
+    # Only the oldest account per normalized key gets it; later duplicates keep NULL and
+    # remain reachable through the exact-match lookup, which runs first.
+    op.execute(
+        f"UPDATE users SET {column} = ranked.key FROM ("
+        f"SELECT id, key, row_number() OVER (PARTITION BY key ORDER BY created_at, id) AS rank "
+        f"FROM (SELECT id, created_at, {expression} AS key FROM users) AS keyed WHERE {valid}"
+        f") AS ranked WHERE users.id = ranked.id AND ranked.rank = 1"
+    )
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("email_normalized", sa.String(), nullable=True))
+    op.add_column("users", sa.Column("phone_e164", sa.String(), nullable=True))
+
+    _backfill("email_normalized", "lower(trim(email))", "key IS NOT NULL")
+    _backfill("phone_e164", PHONE_E164, r"key ~ '^\+[1-9][0-9]{7,14}$'")
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_users_email_normalized",
+            "users",
+            ["email_normalized"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_users_phone_e164",
+            "users",
+            ["phone_e164"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_users_phone_e164", table_name="users", postgresql_concurrently=True)
+        op.drop_index("ix_users_email_normalized", table_name="users", postgresql_concurrently=True)
+    op.drop_column("users", "phone_e164")
+    op.drop_column("users", "email_normalized")
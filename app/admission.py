@@ -0,0 +1,71 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+
+
+class OverloadedError(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Service overloaded")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, concurrency: int, max_queue: int, max_wait_seconds: float, retry_after: int):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    @asynccontextmanager
+    async def admit(self):
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+        else:
+            await self._wait_for_slot()
+        self.admitted += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def _wait_for_slot(self) -> None:
+        if self.queued >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise OverloadedError(self.retry_after)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            self.rejected_timeout += 1
+            raise OverloadedError(self.retry_after) from None
+        finally:
+            self.queued -= 1
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+        }
+
+
+async def overloaded_exception_handler(request: Request, exc: OverloadedError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Service overloaded, retry later"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
@@ -1,18 +1,36 @@
 from uuid import UUID
 from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
 
-from fastapi import APIRouter, Depends, Form, HTTPException, Request, status
-from fastapi.responses import RedirectResponse
+from fastapi import APIRouter, Depends, Form, HTTPException, Query, Request, status
+from fastapi.responses import RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 
-from ... import crud, db, models
+from ... import (
+    api_key_usage,
+    auth_events,
+    crud,
+    db,
+    db_pool,
+    email_outbox,
+    exports,
+    hashing,
+    metering,
+    models,
+    token_reaper,
+    user_cache,
+)
 from ...admin_auth import require_admin
+from ...service_auth import api_key_cache_stats, invalidate_api_key
 
 router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
 
 templates = Jinja2Templates(directory="app/templates")
 
+USERS_PAGE_SIZE = 100
+EVENTS_PAGE_SIZE = 200
+
 
 @router.get("/")
 def admin_root():
@@ -74,13 +92,14 @@ def _format_bucket(period: str, dt: datetime) -> str:
 
 
 @router.get("/dashboard")
-def admin_dashboard(request: Request, db_session: Session = Depends(db.get_db)):
+def admin_dashboard(request: Request, db_session: Session = Depends(db.get_read_db)):
     now = datetime.now(timezone.utc)
+    counts = crud.count_totals(db_session)
     totals = {
-        "users": crud.count_users(db_session),
-        "services": crud.count_services(db_session),
-        "service_keys": crud.count_service_api_keys(db_session),
-        "auth_events": crud.count_auth_events(db_session),
+        "users": counts.get("users", 0),
+        "services": counts.get("services", 0),
+        "service_keys": counts.get("service_api_keys", 0),
+        "auth_events": counts.get("auth_events", 0),
     }
     latest_events = crud.list_auth_events(db_session, limit=10)
 
@@ -107,8 +126,8 @@ def admin_dashboard(request: Request, db_session: Session = Depends(db.get_db)):
 
         user_activity = crud.count_by_period(
             db_session,
-            model=models.AuthEvent,
-            date_field=models.AuthEvent.created_at,
+            day_field=models.AuthEventDailyCount.day,
+            count_field=models.AuthEventDailyCount.count,
             period=period,
             start=start,
             end=end,
@@ -125,11 +144,12 @@ def admin_dashboard(request: Request, db_session: Session = Depends(db.get_db)):
     service_end = _add_months(_start_of_month(now), 1)
     service_created = crud.count_by_period(
         db_session,
-        model=models.Service,
-        date_field=models.Service.created_at,
+        day_field=models.DailyEntityCount.day,
+        count_field=models.DailyEntityCount.created,
         period="month",
         start=service_start,
         end=service_end,
+        criteria=[models.DailyEntityCount.entity == "services"],
     )
     service_items = [
         {"label": _format_bucket("month", bucket), "value": service_created.get(bucket, 0)}
@@ -144,22 +164,97 @@ def admin_dashboard(request: Request, db_session: Session = Depends(db.get_db)):
     )
 
 
+def _encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    return f"{created_at.isoformat()}_{row_id}"
+
+
+def _decode_cursor(cursor: str | None) -> tuple[datetime, UUID] | None:
+    if not cursor:
+        return None
+    try:
+        created_at, row_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _parse_uuid(value: str | None, name: str) -> UUID | None:
+    if not value:
+        return None
+    try:
+        return UUID(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}")
+
+
+def _parse_datetime(value: str | None, name: str) -> datetime | None:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _page_url(path: str, params: dict, cursor: str | None = None) -> str:
+    query = {key: value for key, value in params.items() if value}
+    if cursor:
+        query["cursor"] = cursor
+    return f"{path}?{urlencode(query)}" if query else path
+
+
 @router.get("/users")
-def admin_users(request: Request, db_session: Session = Depends(db.get_db)):
-    rows = crud.list_users_with_last_auth_event(db_session)
+def admin_users(
+    request: Request,
+    cursor: str | None = Query(None),
+    db_session: Session = Depends(db.get_read_db),
+):
+    users = crud.list_users_with_last_auth_event(
+        db_session,
+        limit=USERS_PAGE_SIZE + 1,
+        before=_decode_cursor(cursor),
+    )
+    next_url = None
+    if len(users) > USERS_PAGE_SIZE:
+        users = users[:USERS_PAGE_SIZE]
+        last_user = users[-1]
+        next_url = _page_url("/auth/admin/users", {}, _encode_cursor(last_user.created_at, last_user.id))
     return templates.TemplateResponse(
         "users.html",
-        {"request": request, "rows": rows},
+        {
+            "request": request,
+            "users": users,
+            "next_url": next_url,
+            "first_url": "/auth/admin/users" if cursor else None,
+        },
     )
 
 
+@router.post("/users/{user_id}/toggle")
+def admin_toggle_user(
+    user_id: UUID,
+    is_active: bool = Form(...),
+    db_session: Session = Depends(db.get_db),
+):
+    user = crud.get_user_by_id(db_session, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    crud.set_user_active(db_session, user, is_active=is_active)
+    db_session.commit()
+    return RedirectResponse(url="/admin/users", status_code=status.HTTP_303_SEE_OTHER)
+
+
 @router.get("/services")
-def admin_services(request: Request, db_session: Session = Depends(db.get_db)):
+def admin_services(request: Request, db_session: Session = Depends(db.get_read_db)):
     services = crud.list_services(db_session)
     service_keys = {service.id: crud.list_service_api_keys(db_session, service.id) for service in services}
+    usage = crud.summarize_service_usage(db_session, since=datetime.now(timezone.utc) - timedelta(hours=24))
     return templates.TemplateResponse(
         "services.html",
-        {"request": request, "services": services, "service_keys": service_keys},
+        {"request": request, "services": services, "service_keys": service_keys, "usage": usage},
     )
 
 
@@ -182,6 +277,8 @@ def admin_create_service(
         verification_method=verification_method,
     )
     api_key, db_key = crud.create_service_api_key(db_session, service.id)
+    db_session.commit()
+    invalidate_api_key(db_key.key_hash)
     return templates.TemplateResponse(
         "service_key_created.html",
         {"request": request, "service": service, "api_key": api_key, "api_key_id": db_key.id},
@@ -198,6 +295,8 @@ def admin_create_service_key(
     if not service:
         raise HTTPException(status_code=404, detail="Service not found")
     api_key, db_key = crud.create_service_api_key(db_session, service.id)
+    db_session.commit()
+    invalidate_api_key(db_key.key_hash)
     return templates.TemplateResponse(
         "service_key_created.html",
         {"request": request, "service": service, "api_key": api_key, "api_key_id": db_key.id},
@@ -214,6 +313,9 @@ def admin_toggle_service(
     if not service:
         raise HTTPException(status_code=404, detail="Service not found")
     crud.set_service_active(db_session, service, is_active=is_active)
+    db_session.commit()
+    for api_key in crud.list_service_api_keys(db_session, service.id):
+        invalidate_api_key(api_key.key_hash)
     return RedirectResponse(url="/admin/services", status_code=status.HTTP_303_SEE_OTHER)
 
 
@@ -227,6 +329,8 @@ def admin_toggle_key(
     if not api_key:
         raise HTTPException(status_code=404, detail="API key not found")
     crud.set_service_api_key_active(db_session, api_key, is_active=is_active)
+    db_session.commit()
+    invalidate_api_key(api_key.key_hash)
     return RedirectResponse(url="/admin/services", status_code=status.HTTP_303_SEE_OTHER)
 
 
@@ -238,19 +342,131 @@ def admin_delete_key(
     api_key = crud.get_service_api_key_by_id(db_session, api_key_id)
     if not api_key:
         raise HTTPException(status_code=404, detail="API key not found")
+    key_hash = api_key.key_hash
     crud.delete_service_api_key(db_session, api_key)
+    db_session.commit()
+    invalidate_api_key(key_hash)
     return RedirectResponse(url="/admin/services", status_code=status.HTTP_303_SEE_OTHER)
 
 
+@router.get("/metrics")
+def admin_metrics():
+    return {
+        "password_hashing": hashing.stats(),
+        "user_cache": user_cache.stats(),
+        "api_key_cache": api_key_cache_stats(),
+        "api_key_usage": {"pending_keys": api_key_usage.pending_count()},
+        "metering": {"pending_buckets": metering.pending_count()},
+        "auth_events": auth_events.stats(),
+        "token_reaper": token_reaper.stats(),
+        "email_outbox": email_outbox.stats(),
+        "db_pool": {
+            "sync": db_pool.pool_stats(db.engine),
+            "async": db_pool.pool_stats(db.async_engine.sync_engine),
+            "read": db_pool.pool_stats(db.read_engine) if db.read_engine is not db.engine else None,
+        },
+    }
+
+
 @router.get("/events")
-def admin_events(request: Request, db_session: Session = Depends(db.get_db)):
-    events = crud.list_auth_events(db_session)
+def admin_events(
+    request: Request,
+    cursor: str | None = Query(None),
+    user: str | None = Query(None),
+    service_id: str | None = Query(None),
+    event_type: str | None = Query(None),
+    since: str | None = Query(None),
+    until: str | None = Query(None),
+    db_session: Session = Depends(db.get_read_db),
+):
+    filters = {
+        "user": (user or "").strip(),
+        "service_id": service_id or "",
+        "event_type": event_type or "",
+        "since": since or "",
+        "until": until or "",
+    }
+    user_id = None
+    if filters["user"]:
+        try:
+            user_id = UUID(filters["user"])
+        except ValueError:
+            matched_user = crud.get_user_by_identifier(db_session, filters["user"])
+            # An unknown user matches no events rather than all of them.
+            user_id = matched_user.id if matched_user else UUID(int=0)
+
+    events = crud.list_auth_events(
+        db_session,
+        limit=EVENTS_PAGE_SIZE + 1,
+        before=_decode_cursor(cursor),
+        user_id=user_id,
+        service_id=_parse_uuid(filters["service_id"], "service_id"),
+        event_type=filters["event_type"] or None,
+        since=_parse_datetime(filters["since"], "since"),
+        until=_parse_datetime(filters["until"], "until"),
+    )
+    next_url = None
+    if len(events) > EVENTS_PAGE_SIZE:
+        events = events[:EVENTS_PAGE_SIZE]
+        last_event = events[-1][0]
+        next_url = _page_url("/auth/admin/events", filters, _encode_cursor(last_event.created_at, last_event.id))
     return templates.TemplateResponse(
         "events.html",
-        {"request": request, "events": events},
+        {
+            "request": request,
+            "events": events,
+            "filters": filters,
+            "services": crud.list_services(db_session),
+            "event_types": crud.list_auth_event_types(db_session),
+            "next_url": next_url,
+            "first_url": _page_url("/auth/admin/events", filters) if cursor else None,
+        },
     )
 
 
+def _export_response(
+    kind: str,
+    fmt: str,
+    since: str | None,
+    until: str | None,
+    service_id: str | None = None,
+) -> StreamingResponse:
+    if fmt not in exports.FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid format")
+    body = exports.iter_export(
+        kind,
+        fmt,
+        since=_parse_datetime(since, "since"),
+        until=_parse_datetime(until, "until"),
+        service_id=_parse_uuid(service_id, "service_id"),
+    )
+    filename = f"{kind}-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.{fmt}"
+    return StreamingResponse(
+        body,
+        media_type=exports.FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/export/events")
+def admin_export_events(
+    format: str = Query("ndjson"),
+    since: str | None = Query(None),
+    until: str | None = Query(None),
+    service_id: str | None = Query(None),
+):
+    return _export_response("events", format, since, until, service_id)
+
+
+@router.get("/export/users")
+def admin_export_users(
+    format: str = Query("ndjson"),
+    since: str | None = Query(None),
+    until: str | None = Query(None),
+):
+    return _export_response("users", format, since, until)
+
+
 def _normalize_verification_method(value: str) -> str:
     normalized = value.strip().lower()
     if normalized not in {"link", "code"}:
@@ -1,13 +1,15 @@
 from datetime import datetime, timezone
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ... import db, crud, schemas, auth
+from ... import db, crud, crud_async, schemas, auth, auth_events, email_outbox, hashing, jwt_keys
 from ...oauth_google import (
     build_google_auth_url,
     create_state,
@@ -17,7 +19,7 @@ from ...oauth_google import (
     verify_id_token,
 )
 from ...config import settings
-from ...email import send_email, build_verification_email, build_password_reset_email
+from ...email import build_verification_email, build_password_reset_email
 from ...limiter import limiter
 
 router = APIRouter()
@@ -26,50 +28,20 @@ templates = Jinja2Templates(directory="app/templates")
 
 @router.post("/register", response_model=schemas.UserRead)
 @limiter.limit(settings.register_rate_limit)
-def register(request: Request, user_in: schemas.UserCreate, db: Session = Depends(db.get_db)):
-    if user_in.email:
-        existing = crud.get_user_by_email(db, user_in.email)
-        if existing:
-            raise HTTPException(status_code=400, detail="Email already registered")
-    if user_in.phone:
-        existing = crud.get_user_by_phone(db, user_in.phone)
-        if existing:
-            raise HTTPException(status_code=400, detail="Phone already registered")
-    try:
-        user = crud.create_user(db, user_in)
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
-    if user.email:
-        verification_method = _get_request_verification_method(request)
-        if verification_method == "code":
-            token = auth.generate_verification_code()
-            token, _ = crud.create_email_verification_token(db, user.id, token=token)
-        else:
-            token, _ = crud.create_email_verification_token(db, user.id)
-        subject, body, html_body = build_verification_email(
-            token,
-            service_name=_get_request_service_name(request),
-            verification_method=verification_method,
-        )
-        send_email(user.email, subject, body, html_body)
-    crud.create_auth_event(
-        db,
-        user_id=user.id,
-        event_type="register",
-        ip_address=_get_request_ip(request),
-        service_id=_get_request_service_id(request),
-    )
-    return user
+async def register(request: Request, user_in: schemas.UserCreate, db: Session = Depends(db.get_db)):
+    await run_in_threadpool(_ensure_identifier_available, db, user_in)
+    hashed_password = await hashing.hash_password(user_in.password)
+    return await run_in_threadpool(_register_user, request, db, user_in, hashed_password)
 
 
 @router.post("/token", response_model=schemas.TokenPair)
 @limiter.limit(settings.token_rate_limit)
-def login_for_access_token(
+async def login_for_access_token(
     request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(db.get_db),
+    db: AsyncSession = Depends(db.get_async_db),
 ):
-    user = crud.authenticate_user(db, form_data.username, form_data.password)
+    user = await crud_async.authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -78,14 +50,15 @@ def login_for_access_token(
         )
     if user.email and not user.email_verified:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Email not verified")
-    access_token = auth.create_access_token(data={"sub": str(user.id)})
-    refresh_token, _ = crud.create_refresh_token(db, user.id)
-    crud.create_auth_event(
-        db,
+    access_token = auth.create_access_token(data={"sub": str(user.id), "gen": user.token_generation})
+    refresh_token, _ = await crud_async.create_refresh_token(db, user.id)
+    await db.commit()
+    auth_events.record(
         user_id=user.id,
         event_type="login",
         ip_address=_get_request_ip(request),
         service_id=_get_request_service_id(request),
+        block=False,
     )
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
@@ -101,7 +74,7 @@ def google_login(request: Request):
 
 
 @router.get("/google/callback", response_model=schemas.TokenPair)
-def google_callback(
+async def google_callback(
     request: Request,
     code: str | None = None,
     state: str | None = None,
@@ -125,7 +98,7 @@ def google_callback(
         raise HTTPException(status_code=400, detail="Invalid state")
 
     try:
-        token_response = exchange_code_for_token(code)
+        token_response = await run_in_threadpool(exchange_code_for_token, code)
     except Exception as exc:
         raise HTTPException(status_code=400, detail="Failed to exchange code") from exc
 
@@ -134,7 +107,7 @@ def google_callback(
         raise HTTPException(status_code=400, detail="Missing id_token")
 
     try:
-        payload = verify_id_token(id_token, nonce)
+        payload = await run_in_threadpool(verify_id_token, id_token, nonce)
     except Exception as exc:
         raise HTTPException(status_code=400, detail="Invalid id_token") from exc
 
@@ -147,72 +120,110 @@ def google_callback(
     if not subject:
         raise HTTPException(status_code=400, detail="Invalid subject")
 
-    oauth_account = crud.get_oauth_account(db, "google", subject)
-    if oauth_account:
-        user = oauth_account.user
-    else:
-        user = crud.get_user_by_email(db, email)
-        if not user:
-            user = crud.create_user_from_oauth(db, email)
-        crud.create_oauth_account(db, user.id, "google", subject, email)
-    if user.email_verified is False:
-        user.email_verified = True
-        db.commit()
-        db.refresh(user)
+    user, linked = await run_in_threadpool(_find_google_user, db, subject, email)
+    hashed_password = None
+    if user is None:
+        hashed_password = await hashing.hash_password(auth.generate_token(24))
 
-    access_token = auth.create_access_token(data={"sub": str(user.id)})
-    refresh_token, _ = crud.create_refresh_token(db, user.id)
     service_id = state_payload.get("service_id")
     if service_id:
         try:
             service_id = UUID(str(service_id))
         except (TypeError, ValueError):
             service_id = None
-    crud.create_auth_event(
+    return await run_in_threadpool(
+        _complete_google_login,
         db,
-        user_id=user.id,
-        event_type="login_google",
-        ip_address=_get_request_ip(request),
-        service_id=service_id,
+        user,
+        linked,
+        subject,
+        email,
+        hashed_password,
+        _get_request_ip(request),
+        service_id,
     )
-    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
 @router.post("/token/refresh", response_model=schemas.TokenPair)
-def refresh_access_token(
+async def refresh_access_token(
     request: Request,
     payload: schemas.RefreshTokenRequest,
-    db: Session = Depends(db.get_db),
+    db: AsyncSession = Depends(db.get_async_db),
 ):
-    db_token = crud.get_refresh_token(db, payload.refresh_token)
-    if not db_token or db_token.revoked:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
-    if _is_expired(db_token.expires_at):
-        crud.revoke_refresh_token(db, db_token)
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token expired")
-
-    access_token = auth.create_access_token(data={"sub": str(db_token.user.id)})
-    crud.revoke_refresh_token(db, db_token)
-    refresh_token, _ = crud.create_refresh_token(db, db_token.user_id)
-    crud.create_auth_event(
-        db,
-        user_id=db_token.user_id,
+    rotated = await crud_async.rotate_refresh_token(db, payload.refresh_token)
+    if rotated is None:
+        await _reject_refresh_token(request, db, payload.refresh_token)
+    refresh_token, user_id, generation = rotated
+    await db.commit()
+    access_token = auth.create_access_token(data={"sub": str(user_id), "gen": generation})
+    auth_events.record(
+        user_id=user_id,
         event_type="token_refresh",
         ip_address=_get_request_ip(request),
         service_id=_get_request_service_id(request),
+        block=False,
     )
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
+async def _reject_refresh_token(request: Request, db: AsyncSession, token: str):
+    # Only reached when rotation matched nothing, so this read is off the success path.
+    db_token = await crud_async.get_refresh_token(db, token)
+    if db_token is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    if db_token.revoked:
+        # A rotated-away token came back: assume it leaked and end every session descended from that login.
+        if await crud_async.revoke_refresh_token_family(db, token):
+            await db.commit()
+            auth_events.record(
+                user_id=db_token.user_id,
+                event_type="refresh_token_reuse",
+                ip_address=_get_request_ip(request),
+                service_id=_get_request_service_id(request),
+                block=False,
+            )
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token expired")
+
+
+@router.post("/token/introspect", response_model=schemas.TokenIntrospectionResponse)
+async def introspect_tokens(payload: schemas.TokenIntrospectionRequest, db: AsyncSession = Depends(db.get_async_db)):
+    if len(payload.tokens) > settings.token_introspect_max_tokens:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.token_introspect_max_tokens} tokens per request",
+        )
+    return {"results": await auth.introspect_tokens(db, payload.tokens)}
+
+
 @router.post("/logout")
-def logout(payload: schemas.RefreshTokenRequest, db: Session = Depends(db.get_db)):
-    db_token = crud.get_refresh_token(db, payload.refresh_token)
+async def logout(payload: schemas.RefreshTokenRequest, db: AsyncSession = Depends(db.get_async_db)):
+    db_token = await crud_async.get_refresh_token(db, payload.refresh_token)
     if not db_token or db_token.revoked:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Already logged out")
-    crud.revoke_refresh_token(db, db_token)
+    await crud_async.revoke_refresh_token(db, db_token)
+    await db.commit()
     return {"detail": "Logged out"}
 
 
+@router.post("/logout/all")
+async def logout_all(
+    request: Request,
+    current_user=Depends(auth.get_current_user),
+    db: AsyncSession = Depends(db.get_async_db),
+):
+    await crud_async.revoke_all_sessions(db, current_user.id)
+    await db.commit()
+    auth_events.record(
+        user_id=current_user.id,
+        event_type="logout_all",
+        ip_address=_get_request_ip(request),
+        service_id=_get_request_service_id(request),
+        block=False,
+    )
+    return {"detail": "Logged out everywhere"}
+
+
 @router.get("/verify-email")
 def verify_email(token: str, db: Session = Depends(db.get_db)):
     db_token = crud.get_email_verification_token(db, token)
@@ -221,6 +232,7 @@ def verify_email(token: str, db: Session = Depends(db.get_db)):
     if _is_expired(db_token.expires_at):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token expired")
     crud.mark_email_verified(db, db_token)
+    db.commit()
     return {"detail": "Email verified"}
 
 
@@ -235,6 +247,7 @@ def verify_email_code(payload: schemas.EmailVerificationCodeRequest, db: Session
     if _is_expired(db_token.expires_at):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Code expired")
     crud.mark_email_verified(db, db_token)
+    db.commit()
     return {"detail": "Email verified"}
 
 
@@ -257,7 +270,9 @@ def resend_verification(
             service_name=_get_request_service_name(request),
             verification_method=verification_method,
         )
-        send_email(user.email, subject, body, html_body)
+        crud.enqueue_email(db, user.email, subject, body, html_body)
+        db.commit()
+        email_outbox.wake()
     return {"detail": "If the account exists, a verification email was sent"}
 
 
@@ -267,7 +282,9 @@ def forgot_password(payload: schemas.EmailRequest, db: Session = Depends(db.get_
     if user:
         token, _ = crud.create_password_reset_token(db, user.id)
         subject, body = build_password_reset_email(token)
-        send_email(user.email, subject, body)
+        crud.enqueue_email(db, user.email, subject, body)
+        db.commit()
+        email_outbox.wake()
     return {"detail": "If the account exists, a reset email was sent"}
 
 
@@ -280,32 +297,121 @@ def reset_password_form(request: Request, token: str | None = None):
 
 
 @router.post("/password/reset")
-def reset_password(payload: schemas.PasswordResetRequest, db: Session = Depends(db.get_db)):
-    db_token = crud.get_password_reset_token(db, payload.token)
+async def reset_password(payload: schemas.PasswordResetRequest, db: Session = Depends(db.get_db)):
+    db_token = await run_in_threadpool(crud.get_password_reset_token, db, payload.token)
     if not db_token or db_token.used_at:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid token")
     if _is_expired(db_token.expires_at):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token expired")
-    try:
-        crud.mark_password_reset_used(db, db_token, payload.password)
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    hashed_password = await hashing.hash_password(payload.password)
+    await run_in_threadpool(_complete_password_reset, db, db_token, hashed_password)
     return {"detail": "Password updated"}
 
 
+@router.get("/.well-known/jwks.json")
+def get_jwks(response: Response):
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return jwt_keys.get_jwks()
+
+
 @router.get("/users/me", response_model=schemas.UserRead)
-def read_users_me(current_user=Depends(auth.get_current_user)):
+async def read_users_me(current_user=Depends(auth.get_current_user)):
     return current_user
 
 
 @router.post("/users/id", response_model=schemas.UserIdResponse)
-def get_user_id_by_email(payload: schemas.EmailRequest, db: Session = Depends(db.get_db)):
+def get_user_id_by_email(payload: schemas.EmailRequest, db: Session = Depends(db.get_read_db)):
     user = crud.get_user_by_email(db, payload.email)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return {"id": user.id}
 
 
+def _ensure_identifier_available(db: Session, user_in: schemas.UserCreate) -> None:
+    if user_in.email:
+        existing = crud.get_user_by_email(db, user_in.email)
+        if existing:
+            raise HTTPException(status_code=400, detail="Email already registered")
+    if user_in.phone:
+        existing = crud.get_user_by_phone(db, user_in.phone)
+        if existing:
+            raise HTTPException(status_code=400, detail="Phone already registered")
+
+
+def _register_user(request: Request, db: Session, user_in: schemas.UserCreate, hashed_password: str):
+    try:
+        user = crud.create_user(db, user_in, hashed_password)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    verification_method = _get_request_verification_method(request)
+    if user.email:
+        if verification_method == "code":
+            token = auth.generate_verification_code()
+            token, _ = crud.create_email_verification_token(db, user.id, token=token)
+        else:
+            token, _ = crud.create_email_verification_token(db, user.id)
+        subject, body, html_body = build_verification_email(
+            token,
+            service_name=_get_request_service_name(request),
+            verification_method=verification_method,
+        )
+        crud.enqueue_email(db, user.email, subject, body, html_body)
+    db.commit()
+    if user.email:
+        email_outbox.wake()
+    auth_events.record(
+        user_id=user.id,
+        event_type="register",
+        ip_address=_get_request_ip(request),
+        service_id=_get_request_service_id(request),
+    )
+    return user
+
+
+def _issue_token_pair(db: Session, user, event_type: str, ip_address: str | None, service_id):
+    access_token = auth.create_access_token(data={"sub": str(user.id), "gen": user.token_generation})
+    refresh_token, _ = crud.create_refresh_token(db, user.id)
+    db.commit()
+    auth_events.record(
+        user_id=user.id,
+        event_type=event_type,
+        ip_address=ip_address,
+        service_id=service_id,
+    )
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+
+def _find_google_user(db: Session, subject: str, email: str):
+    oauth_account = crud.get_oauth_account(db, "google", subject)
+    if oauth_account:
+        return oauth_account.user, True
+    return crud.get_user_by_email(db, email), False
+
+
+def _complete_google_login(
+    db: Session,
+    user,
+    linked: bool,
+    subject: str,
+    email: str,
+    hashed_password: str | None,
+    ip_address: str | None,
+    service_id,
+):
+    if user is None:
+        user = crud.create_user_from_oauth(db, email, hashed_password)
+    if not linked:
+        crud.create_oauth_account(db, user.id, "google", subject, email)
+    if user.email_verified is False:
+        crud.mark_user_email_verified(db, user)
+    return _issue_token_pair(db, user, "login_google", ip_address, service_id)
+
+
+def _complete_password_reset(db: Session, db_token, hashed_password: str) -> None:
+    crud.mark_password_reset_used(db, db_token, hashed_password)
+    db.commit()
+
+
 def _is_expired(expires_at: datetime) -> bool:
     now = datetime.now(timezone.utc)
     if expires_at.tzinfo is None:
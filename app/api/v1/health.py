@@ -8,7 +8,7 @@ router = APIRouter()
 
 
 @router.get("/health")
-def health_check(db_session: Session = Depends(db.get_db)):
+def health_check(db_session: Session = Depends(db.get_read_db)):
     try:
         db_session.execute(text("SELECT 1"))
     except Exception:
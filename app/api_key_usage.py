@@ -0,0 +1,46 @@
+import threading
+from datetime import datetime, timezone
+from uuid import UUID
+
+from . import crud
+from .background import PeriodicWorker
+from .config import settings
+from .db import SessionLocal
+
+_lock = threading.Lock()
+_pending: dict[UUID, datetime] = {}
+
+
+def record(api_key_id: UUID) -> None:
+    now = datetime.now(timezone.utc)
+    with _lock:
+        _pending[api_key_id] = now
+
+
+def pending_count() -> int:
+    with _lock:
+        return len(_pending)
+
+
+def flush() -> int:
+    global _pending
+    with _lock:
+        batch, _pending = _pending, {}
+    if not batch:
+        return 0
+    db = SessionLocal()
+    try:
+        crud.bulk_touch_service_api_keys(db, batch)
+        db.commit()
+    except Exception:
+        with _lock:
+            for api_key_id, used_at in batch.items():
+                if _pending.get(api_key_id, used_at) <= used_at:
+                    _pending[api_key_id] = used_at
+        raise
+    finally:
+        db.close()
+    return len(batch)
+
+
+worker = PeriodicWorker("api-key-usage-flush", settings.api_key_usage_flush_seconds, flush)
@@ -1,33 +1,21 @@
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 import hashlib
 import secrets
 from uuid import UUID
-from jose import JWTError, jwt
+from jose import JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from .config import settings
-from . import schemas, crud, db as _db
-
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+from . import crud_async, jwt_keys, user_cache, db as _db
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
-
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm="HS256")
-    return encoded_jwt
+    return jwt_keys.encode(to_encode)
 
 
 def generate_refresh_token() -> str:
@@ -50,24 +38,76 @@ def hash_token(token: str) -> str:
     return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(_db.get_db)):
+def decode_access_token(token: str) -> tuple[UUID, dict]:
+    payload = jwt_keys.decode(token)
+    subject = payload.get("sub")
+    if subject is None:
+        raise JWTError("Missing subject")
+    try:
+        user_id = UUID(str(subject))
+    except (TypeError, ValueError) as exc:
+        raise JWTError("Invalid subject") from exc
+    return user_id, payload
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(_db.get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=["HS256"])
-        subject = payload.get("sub")
-        if subject is None:
-            raise credentials_exception
+        user_id, payload = decode_access_token(token)
     except JWTError:
         raise credentials_exception
-    try:
-        user_id = UUID(str(subject))
-    except (TypeError, ValueError):
-        raise credentials_exception
-    user = crud.get_user_by_id(db, user_id=user_id)
-    if user is None:
+    generation = _token_generation(payload)
+    user = user_cache.get(user_id)
+    if user is None or user.token_generation < generation:
+        db_user = await crud_async.get_user_by_id(db, user_id=user_id)
+        if db_user is None:
+            raise credentials_exception
+        user = user_cache.put(db_user)
+    if user.token_generation != generation:
         raise credentials_exception
     return user
+
+
+def _token_generation(payload: dict) -> int:
+    # Tokens issued before the claim existed count as generation 0. A claim newer than the cached
+    # snapshot means another worker bumped it, so callers reload instead of rejecting.
+    return payload.get("gen", 0)
+
+
+async def introspect_tokens(db: AsyncSession, tokens: list[str]) -> list[dict]:
+    decoded = []
+    for token in tokens:
+        try:
+            decoded.append(decode_access_token(token))
+        except JWTError:
+            decoded.append(None)
+
+    users = {}
+    missing = set()
+    for item in decoded:
+        if item is None:
+            continue
+        user = user_cache.get(item[0])
+        if user is None or user.token_generation < _token_generation(item[1]):
+            missing.add(item[0])
+        else:
+            users[user.id] = user
+    if missing:
+        for db_user in await crud_async.get_users_by_ids(db, missing):
+            users[db_user.id] = user_cache.put(db_user)
+
+    results = []
+    for item in decoded:
+        if item is None or item[0] not in users:
+            results.append({"active": False})
+            continue
+        user_id, payload = item
+        if users[user_id].token_generation != _token_generation(payload):
+            results.append({"active": False})
+            continue
+        results.append({"active": True, "sub": user_id, "exp": payload.get("exp"), "claims": payload})
+    return results
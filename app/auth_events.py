@@ -0,0 +1,135 @@
+import logging
+import queue
+import threading
+import uuid
+from datetime import datetime, timezone
+from uuid import UUID
+
+from sqlalchemy.exc import DataError, IntegrityError
+
+from . import crud
+from .background import PeriodicWorker
+from .config import settings
+from .db import SessionLocal
+
+logger = logging.getLogger("app.auth_events")
+
+_queue: queue.Queue = queue.Queue(maxsize=settings.auth_event_queue_size)
+_counter_lock = threading.Lock()
+_dropped = 0
+_written = 0
+_dead_lettered = 0
+
+
+def record(
+    user_id: UUID,
+    event_type: str,
+    ip_address: str | None,
+    service_id: UUID | None,
+    block: bool = True,
+) -> bool:
+    # Callers on the event loop pass block=False so a full queue drops instead of stalling the loop.
+    global _dropped
+    event = {
+        "id": uuid.uuid4(),
+        "user_id": user_id,
+        "event_type": event_type,
+        "ip_address": ip_address,
+        "service_id": service_id,
+        "created_at": datetime.now(timezone.utc),
+    }
+    try:
+        _queue.put(event, block=block, timeout=settings.auth_event_enqueue_timeout_ms / 1000)
+    except queue.Full:
+        with _counter_lock:
+            _dropped += 1
+        logger.warning("auth event queue full, dropped %s event for user_id=%s", event_type, user_id)
+        return False
+    if _queue.qsize() >= settings.auth_event_batch_size:
+        worker.wake()
+    return True
+
+
+def _drain(limit: int) -> list[dict]:
+    batch = []
+    while len(batch) < limit:
+        try:
+            batch.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def flush() -> int:
+    total = 0
+    while True:
+        batch = _drain(settings.auth_event_batch_size)
+        if not batch:
+            return total
+        total += _write(batch)
+
+
+def _write(batch: list[dict]) -> int:
+    global _written, _dead_lettered
+    written = 0
+    pending = [batch]
+    while pending:
+        chunk = pending.pop()
+        try:
+            _insert(chunk)
+        except (IntegrityError, DataError):
+            # The database rejected a row, not the connection: split the chunk so only that event is dropped.
+            if len(chunk) == 1:
+                with _counter_lock:
+                    _dead_lettered += 1
+                logger.error("dropping auth event the database rejected: %r", chunk[0], exc_info=True)
+                continue
+            middle = len(chunk) // 2
+            pending += [chunk[middle:], chunk[:middle]]
+        except Exception:
+            # Anything else (database down, timeouts) keeps every unwritten event; the worker backs off and retries.
+            _requeue([event for events in [chunk, *pending] for event in events])
+            raise
+        else:
+            written += len(chunk)
+            with _counter_lock:
+                _written += len(chunk)
+    return written
+
+
+def _insert(events: list[dict]) -> None:
+    db = SessionLocal()
+    try:
+        crud.insert_auth_events(db, events)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _requeue(events: list[dict]) -> None:
+    global _dropped
+    for event in events:
+        try:
+            _queue.put_nowait(event)
+        except queue.Full:
+            with _counter_lock:
+                _dropped += 1
+
+
+def stats() -> dict:
+    return {
+        "queue_depth": _queue.qsize(),
+        "queue_size": settings.auth_event_queue_size,
+        "written": _written,
+        "dropped": _dropped,
+        "dead_lettered": _dead_lettered,
+        "consecutive_failures": worker.failures,
+    }
+
+
+worker = PeriodicWorker(
+    "auth-event-writer",
+    settings.auth_event_flush_seconds,
+    flush,
+    max_backoff_seconds=settings.auth_event_max_backoff_seconds,
+)
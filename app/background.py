@@ -0,0 +1,79 @@
+import logging
+import threading
+
+logger = logging.getLogger("app.background")
+
+
+class PeriodicWorker:
+    def __init__(
+        self,
+        name: str,
+        interval_seconds: float,
+        fn,
+        run_on_stop: bool = True,
+        max_backoff_seconds: float | None = None,
+    ):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.fn = fn
+        self.run_on_stop = run_on_stop
+        # When set, consecutive failed runs double the wait (up to this cap) instead of retrying every interval.
+        self.max_backoff_seconds = max_backoff_seconds
+        self.failures = 0
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stopping.is_set()
+
+    def stop(self, timeout: float | None = 30) -> None:
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        thread, self._thread = self._thread, None
+        thread.join(timeout)
+        # One last run so buffered work is not lost on shutdown.
+        if self.run_on_stop:
+            self._call()
+        if not thread.is_alive():
+            # Once stopped, direct calls of fn (scripts, tests) must not see a stop in progress.
+            self._stopping.clear()
+
+    def next_delay(self) -> float:
+        if not self.failures or self.max_backoff_seconds is None:
+            return self.interval_seconds
+        return min(self.interval_seconds * 2 ** min(self.failures, 32), self.max_backoff_seconds)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            if self.failures and self.max_backoff_seconds is not None:
+                # wake() is ignored while backing off, so a busy producer cannot hammer a failing dependency.
+                self._stopping.wait(self.next_delay())
+            else:
+                self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+            if self._stopping.is_set():
+                break
+            self._call()
+
+    def _call(self) -> None:
+        try:
+            self.fn()
+        except Exception:
+            self.failures += 1
+            logger.exception("%s run failed (%s in a row)", self.name, self.failures)
+        else:
+            self.failures = 0
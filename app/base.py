@@ -1,3 +1,9 @@
 from sqlalchemy.orm import declarative_base
 
-Base = declarative_base()
+
+class _Base:
+    # Server defaults (created_at etc.) come back via RETURNING on flush instead of a refresh SELECT.
+    __mapper_args__ = {"eager_defaults": True}
+
+
+Base = declarative_base(cls=_Base)
@@ -3,8 +3,21 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     database_url: str
+    async_database_url: str | None = None
+    read_database_url: str | None = None
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: float = 30
+    db_pool_recycle_seconds: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 0
+    db_prepared_statement_cache_size: int = 500
     secret_key: str
     access_token_expire_minutes: int = 60
+    jwt_algorithm: str = "HS256"
+    jwt_keys_dir: str | None = None
+    jwt_active_kid: str | None = None
+    token_introspect_max_tokens: int = 500
     refresh_token_expire_days: int = 30
     email_verify_expire_minutes: int = 5
     password_reset_expire_minutes: int = 30
@@ -14,9 +27,47 @@ class Settings(BaseSettings):
     smtp_password: str | None = None
     smtp_from_name: str = "Auth Service"
     smtp_from_email: str | None = None
+    smtp_starttls: bool = True
+    smtp_timeout_seconds: float = 10
     app_base_url: str = "http://localhost:8050"
     register_rate_limit: str = "5/10 minute"
     token_rate_limit: str = "10/5 minute"
+    password_hash_workers: int = 0
+    password_hash_queue_size: int = 64
+    password_hash_max_wait_ms: int = 2000
+    password_hash_retry_after_seconds: int = 5
+    argon2_time_cost: int | None = None
+    argon2_memory_cost: int | None = None
+    argon2_parallelism: int | None = None
+    user_cache_size: int = 10000
+    user_cache_ttl_seconds: float = 60
+    api_key_cache_size: int = 1024
+    api_key_cache_ttl_seconds: float = 30
+    api_key_cache_negative_ttl_seconds: float = 5
+    api_key_usage_flush_seconds: float = 10
+    metering_flush_seconds: float = 60
+    auth_event_queue_size: int = 10000
+    auth_event_batch_size: int = 500
+    auth_event_flush_seconds: float = 1
+    auth_event_enqueue_timeout_ms: int = 50
+    auth_event_max_backoff_seconds: float = 60
+    auth_event_partitions_ahead: int = 3
+    auth_event_retention_months: int = 12
+    export_batch_size: int = 1000
+    token_reaper_interval_seconds: int = 3600
+    token_reaper_batch_size: int = 1000
+    token_reaper_batch_sleep_ms: int = 100
+    refresh_token_retention_days: int = 7
+    email_verification_token_retention_hours: int = 24
+    password_reset_token_retention_hours: int = 24
+    email_outbox_workers: int = 2
+    email_outbox_poll_seconds: float = 5
+    email_outbox_batch_size: int = 50
+    email_outbox_lease_seconds: int = 300
+    email_outbox_max_attempts: int = 8
+    email_outbox_retry_base_seconds: float = 30
+    email_outbox_retry_max_seconds: float = 3600
+    email_outbox_retention_hours: int = 24
     log_file: str = "app.log"
     admin_user: str = "admin"
     admin_password: str = "admin"
@@ -1,31 +1,32 @@
+from collections import Counter
 from datetime import datetime, timedelta, timezone
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from uuid import UUID
-from sqlalchemy import func, or_
-from . import models, schemas
+from sqlalchemy import DateTime, String, cast, column, delete, func, insert, or_, select, text, tuple_, update, values
+from sqlalchemy.dialects.postgresql import UUID as PGUUID, insert as pg_insert
+from . import identifiers, models, schemas, statements, user_cache
 from .auth import hash_token, generate_token, hash_refresh_token, generate_refresh_token
 from .config import settings
-from .auth import get_password_hash
 
 
 def get_user_by_email(db: Session, email: str):
-    return db.query(models.User).filter(models.User.email == email).first()
+    return get_user_by_identifier(db, email)
 
 
 def get_user_by_phone(db: Session, phone: str):
-    return db.query(models.User).filter(models.User.phone == phone).first()
+    return get_user_by_identifier(db, phone)
 
 
 def get_user_by_identifier(db: Session, identifier: str):
-    return (
-        db.query(models.User)
-        .filter(or_(models.User.email == identifier, models.User.phone == identifier))
-        .first()
-    )
+    for statement, params in statements.user_lookups(identifier):
+        user = db.execute(statement, params).scalars().first()
+        if user is not None:
+            return user
+    return None
 
 
 def get_user_by_id(db: Session, user_id: UUID):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    return db.execute(statements.USER_BY_ID, {"user_id": user_id}).scalars().first()
 
 
 def get_service_by_name(db: Session, name: str):
@@ -36,47 +37,37 @@ def get_service_by_id(db: Session, service_id: UUID):
     return db.query(models.Service).filter(models.Service.id == service_id).first()
 
 
-def create_user(db: Session, user: schemas.UserCreate):
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
     if not user.email and not user.phone:
         raise ValueError("Email or phone is required")
-    hashed = get_password_hash(user.password)
     db_user = models.User(
         email=user.email,
         phone=user.phone,
-        hashed_password=hashed,
+        email_normalized=identifiers.normalize_email(user.email) if user.email else None,
+        phone_e164=identifiers.normalize_phone(user.phone) if user.phone else None,
+        hashed_password=hashed_password,
         email_verified=user.email is None,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    _record_entity_change(db, "users", created=1)
+    db.flush()
     return db_user
 
 
-def create_user_from_oauth(db: Session, email: str):
-    hashed = get_password_hash(generate_token(24))
+def create_user_from_oauth(db: Session, email: str, hashed_password: str):
     db_user = models.User(
         email=email,
         phone=None,
-        hashed_password=hashed,
+        email_normalized=identifiers.normalize_email(email),
+        hashed_password=hashed_password,
         email_verified=True,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    _record_entity_change(db, "users", created=1)
+    db.flush()
     return db_user
 
 
-def authenticate_user(db: Session, identifier: str, password: str):
-    user = get_user_by_identifier(db, identifier)
-    if not user:
-        return None
-    from .auth import verify_password
-
-    if not verify_password(password, user.hashed_password):
-        return None
-    return user
-
-
 def create_refresh_token(db: Session, user_id: UUID):
     token = generate_refresh_token()
     expires_at = datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expire_days)
@@ -86,20 +77,18 @@ def create_refresh_token(db: Session, user_id: UUID):
         expires_at=expires_at,
     )
     db.add(db_token)
-    db.commit()
-    db.refresh(db_token)
+    db.flush()
     return token, db_token
 
 
 def get_refresh_token(db: Session, token: str):
     token_hash = hash_refresh_token(token)
-    return db.query(models.RefreshToken).filter(models.RefreshToken.token_hash == token_hash).first()
+    return db.execute(statements.REFRESH_TOKEN_BY_HASH, {"token_hash": token_hash}).scalars().first()
 
 
 def revoke_refresh_token(db: Session, db_token: models.RefreshToken):
     db_token.revoked = True
-    db.commit()
-    db.refresh(db_token)
+    db.flush()
     return db_token
 
 
@@ -113,8 +102,7 @@ def create_email_verification_token(db: Session, user_id: UUID, token: str | Non
         expires_at=expires_at,
     )
     db.add(db_token)
-    db.commit()
-    db.refresh(db_token)
+    db.flush()
     return token, db_token
 
 
@@ -142,11 +130,25 @@ def get_email_verification_token_for_user(db: Session, user_id: UUID, token: str
 def mark_email_verified(db: Session, db_token: models.EmailVerificationToken):
     db_token.used_at = datetime.now(timezone.utc)
     db_token.user.email_verified = True
-    db.commit()
-    db.refresh(db_token)
+    db.flush()
+    user_cache.invalidate_on_commit(db, db_token.user_id)
     return db_token
 
 
+def mark_user_email_verified(db: Session, user: models.User):
+    user.email_verified = True
+    db.flush()
+    user_cache.invalidate_on_commit(db, user.id)
+    return user
+
+
+def set_user_active(db: Session, user: models.User, is_active: bool):
+    user.is_active = is_active
+    db.flush()
+    user_cache.invalidate_on_commit(db, user.id)
+    return user
+
+
 def create_password_reset_token(db: Session, user_id: UUID):
     token = generate_token(32)
     expires_at = datetime.now(timezone.utc) + timedelta(minutes=settings.password_reset_expire_minutes)
@@ -156,8 +158,7 @@ def create_password_reset_token(db: Session, user_id: UUID):
         expires_at=expires_at,
     )
     db.add(db_token)
-    db.commit()
-    db.refresh(db_token)
+    db.flush()
     return token, db_token
 
 
@@ -170,51 +171,208 @@ def get_password_reset_token(db: Session, token: str):
     )
 
 
-def mark_password_reset_used(db: Session, db_token: models.PasswordResetToken, new_password: str):
+def mark_password_reset_used(db: Session, db_token: models.PasswordResetToken, hashed_password: str):
     db_token.used_at = datetime.now(timezone.utc)
-    db_token.user.hashed_password = get_password_hash(new_password)
-    db.commit()
-    db.refresh(db_token)
+    db_token.user.hashed_password = hashed_password
+    db.flush()
+    revoke_all_sessions(db, db_token.user_id)
     return db_token
 
 
-def create_auth_event(
-    db: Session,
-    user_id: UUID,
-    event_type: str,
-    ip_address: str | None,
-    service_id: UUID | None,
-):
-    db_event = models.AuthEvent(
-        user_id=user_id,
-        event_type=event_type,
-        ip_address=ip_address,
-        service_id=service_id,
+def revoke_all_sessions(db: Session, user_id: UUID):
+    db.execute(statements.REVOKE_ALL_SESSIONS, {"target_user_id": user_id})
+    user_cache.invalidate_on_commit(db, user_id)
+
+
+def enqueue_email(db: Session, to_email: str, subject: str, body: str, html_body: str | None = None):
+    db_email = models.EmailOutbox(to_email=to_email, subject=subject, body=body, html_body=html_body)
+    db.add(db_email)
+    db.flush()
+    return db_email
+
+
+def claim_outbox_emails(db: Session, batch_size: int, lease_seconds: int):
+    # Claimed rows are pushed out by the lease and committed at once, so SMTP runs without holding row locks;
+    # if the sender dies before recording a result the row becomes due again when the lease ends.
+    outbox = models.EmailOutbox.__table__
+    due = (
+        select(outbox.c.id)
+        .where(outbox.c.sent_at.is_(None), outbox.c.failed_at.is_(None), outbox.c.next_attempt_at <= func.now())
+        .order_by(outbox.c.next_attempt_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .cte("due")
+    )
+    result = db.execute(
+        update(outbox)
+        .where(outbox.c.id == due.c.id)
+        .values(attempts=outbox.c.attempts + 1, next_attempt_at=func.now() + timedelta(seconds=lease_seconds))
+        .returning(
+            outbox.c.id,
+            outbox.c.to_email,
+            outbox.c.subject,
+            outbox.c.body,
+            outbox.c.html_body,
+            outbox.c.attempts,
+        )
     )
-    db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
-    return db_event
+    return result.all()
 
 
-def get_service_api_key(db: Session, api_key: str):
-    key_hash = hash_token(api_key)
-    return (
-        db.query(models.ServiceApiKey)
-        .filter(models.ServiceApiKey.key_hash == key_hash)
-        .first()
+def mark_outbox_sent(db: Session, ids: list[UUID]):
+    outbox = models.EmailOutbox.__table__
+    db.execute(
+        update(outbox).where(outbox.c.id.in_(ids)).values(sent_at=func.now(), last_error=None),
+    )
+
+
+def mark_outbox_retry(db: Session, email_id: UUID, error: str, next_attempt_at: datetime):
+    outbox = models.EmailOutbox.__table__
+    db.execute(
+        update(outbox).where(outbox.c.id == email_id).values(last_error=error, next_attempt_at=next_attempt_at),
     )
 
 
+def mark_outbox_failed(db: Session, email_id: UUID, error: str):
+    outbox = models.EmailOutbox.__table__
+    db.execute(update(outbox).where(outbox.c.id == email_id).values(last_error=error, failed_at=func.now()))
+
+
+def insert_auth_events(db: Session, events: list[dict]):
+    db.execute(insert(models.AuthEvent.__table__).values(events))
+    counts = Counter(
+        (
+            event["created_at"].astimezone(timezone.utc).date(),
+            event["service_id"] or models.NO_SERVICE_ID,
+            event["event_type"],
+        )
+        for event in events
+    )
+    # Sorted so concurrent writers lock rollup rows in the same order.
+    rows = [
+        {"day": day, "service_id": service_id, "event_type": event_type, "count": count}
+        for (day, service_id, event_type), count in sorted(counts.items())
+    ]
+    stmt = pg_insert(models.AuthEventDailyCount).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", "service_id", "event_type"],
+        set_={"count": models.AuthEventDailyCount.count + stmt.excluded.count},
+    )
+    db.execute(stmt)
+    _update_users_last_event(db, events)
+
+
+def _update_users_last_event(db: Session, events: list[dict]):
+    latest: dict[UUID, dict] = {}
+    for event in events:
+        current = latest.get(event["user_id"])
+        if current is None or event["created_at"] >= current["created_at"]:
+            latest[event["user_id"]] = event
+    last_events = values(
+        column("user_id", PGUUID(as_uuid=True)),
+        column("created_at", DateTime(timezone=True)),
+        column("event_type", String),
+        column("service_id", PGUUID(as_uuid=True)),
+        name="last_events",
+    ).data(
+        [
+            (user_id, event["created_at"], event["event_type"], event["service_id"])
+            for user_id, event in sorted(latest.items())
+        ]
+    )
+    table = models.User.__table__
+    db.execute(
+        update(table)
+        .where(
+            table.c.id == last_events.c.user_id,
+            or_(table.c.last_event_at.is_(None), table.c.last_event_at <= last_events.c.created_at),
+        )
+        .values(
+            last_event_at=last_events.c.created_at,
+            last_event_type=last_events.c.event_type,
+            # A batch with no service ids leaves the VALUES column untyped (text).
+            last_service_id=cast(last_events.c.service_id, PGUUID(as_uuid=True)),
+        )
+    )
+
+
+def _record_entity_change(db: Session, entity: str, created: int = 0, deleted: int = 0):
+    stmt = pg_insert(models.DailyEntityCount).values(
+        day=datetime.now(timezone.utc).date(),
+        entity=entity,
+        created=created,
+        deleted=deleted,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", "entity"],
+        set_={
+            "created": models.DailyEntityCount.created + stmt.excluded.created,
+            "deleted": models.DailyEntityCount.deleted + stmt.excluded.deleted,
+        },
+    )
+    db.execute(stmt)
+
+
+def get_service_api_key(db: Session, api_key: str):
+    return get_service_api_key_by_hash(db, hash_token(api_key))
+
+
+def get_service_api_key_by_hash(db: Session, key_hash: str):
+    return db.execute(statements.SERVICE_API_KEY_BY_HASH, {"key_hash": key_hash}).scalars().first()
+
+
 def get_service_api_key_by_id(db: Session, api_key_id: UUID):
     return db.query(models.ServiceApiKey).filter(models.ServiceApiKey.id == api_key_id).first()
 
 
-def touch_service_api_key(db: Session, api_key: models.ServiceApiKey):
-    api_key.last_used_at = datetime.now(timezone.utc)
-    db.commit()
-    db.refresh(api_key)
-    return api_key
+def bulk_touch_service_api_keys(db: Session, last_used: dict[UUID, datetime]):
+    touched = values(
+        column("id", PGUUID(as_uuid=True)),
+        column("last_used_at", DateTime(timezone=True)),
+        name="touched",
+    ).data(list(last_used.items()))
+    table = models.ServiceApiKey.__table__
+    db.execute(
+        update(table)
+        .where(table.c.id == touched.c.id)
+        .values(last_used_at=func.greatest(table.c.last_used_at, touched.c.last_used_at))
+    )
+
+
+def upsert_service_usage(db: Session, rows: list[dict]):
+    stmt = pg_insert(models.ServiceUsageMinutely).values(rows)
+    table = models.ServiceUsageMinutely.__table__
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.service_id, table.c.route, table.c.minute],
+        set_={
+            "request_count": table.c.request_count + stmt.excluded.request_count,
+            "error_count": table.c.error_count + stmt.excluded.error_count,
+            "total_duration_ms": table.c.total_duration_ms + stmt.excluded.total_duration_ms,
+        },
+    )
+    db.execute(stmt)
+
+
+def summarize_service_usage(db: Session, since: datetime):
+    rows = (
+        db.query(
+            models.ServiceUsageMinutely.service_id,
+            func.sum(models.ServiceUsageMinutely.request_count).label("requests"),
+            func.sum(models.ServiceUsageMinutely.error_count).label("errors"),
+            func.sum(models.ServiceUsageMinutely.total_duration_ms).label("duration_ms"),
+        )
+        .filter(models.ServiceUsageMinutely.minute >= since)
+        .group_by(models.ServiceUsageMinutely.service_id)
+        .all()
+    )
+    return {
+        row.service_id: {
+            "requests": row.requests,
+            "errors": row.errors,
+            "avg_ms": row.duration_ms / row.requests if row.requests else 0,
+        }
+        for row in rows
+    }
 
 
 def create_service(
@@ -229,8 +387,8 @@ def create_service(
         verification_method=verification_method,
     )
     db.add(db_service)
-    db.commit()
-    db.refresh(db_service)
+    _record_entity_change(db, "services", created=1)
+    db.flush()
     return db_service
 
 
@@ -241,34 +399,16 @@ def create_service_api_key(db: Session, service_id: UUID):
         key_hash=hash_token(api_key),
     )
     db.add(db_key)
-    db.commit()
-    db.refresh(db_key)
+    _record_entity_change(db, "service_api_keys", created=1)
+    db.flush()
     return api_key, db_key
 
 
-def list_users_with_last_auth_event(db: Session, limit: int = 100, offset: int = 0):
-    last_event_subq = (
-        db.query(
-            models.AuthEvent.user_id.label("user_id"),
-            func.max(models.AuthEvent.created_at).label("last_created_at"),
-        )
-        .group_by(models.AuthEvent.user_id)
-        .subquery()
-    )
-    query = (
-        db.query(models.User, models.AuthEvent, models.Service)
-        .outerjoin(last_event_subq, models.User.id == last_event_subq.c.user_id)
-        .outerjoin(
-            models.AuthEvent,
-            (models.AuthEvent.user_id == models.User.id)
-            & (models.AuthEvent.created_at == last_event_subq.c.last_created_at),
-        )
-        .outerjoin(models.Service, models.AuthEvent.service_id == models.Service.id)
-        .order_by(models.User.created_at.desc())
-        .limit(limit)
-        .offset(offset)
-    )
-    return query.all()
+def list_users_with_last_auth_event(db: Session, limit: int = 100, before: tuple[datetime, UUID] | None = None):
+    query = db.query(models.User).options(joinedload(models.User.last_service))
+    if before is not None:
+        query = query.filter(tuple_(models.User.created_at, models.User.id) < tuple_(*before))
+    return query.order_by(models.User.created_at.desc(), models.User.id.desc()).limit(limit).all()
 
 
 def list_services(db: Session):
@@ -294,8 +434,8 @@ def create_oauth_account(db: Session, user_id: UUID, provider: str, subject: str
         email=email,
     )
     db.add(db_account)
-    db.commit()
-    db.refresh(db_account)
+    db.flush()
+    user_cache.invalidate_on_commit(db, user_id)
     return db_account
 
 
@@ -310,59 +450,175 @@ def list_service_api_keys(db: Session, service_id: UUID):
 
 def set_service_active(db: Session, service: models.Service, is_active: bool):
     service.is_active = is_active
-    db.commit()
-    db.refresh(service)
+    db.flush()
     return service
 
 
 def set_service_api_key_active(db: Session, api_key: models.ServiceApiKey, is_active: bool):
     api_key.is_active = is_active
-    db.commit()
-    db.refresh(api_key)
+    db.flush()
     return api_key
 
 
 def delete_service_api_key(db: Session, api_key: models.ServiceApiKey):
     db.delete(api_key)
-    db.commit()
+    _record_entity_change(db, "service_api_keys", deleted=1)
+    db.flush()
 
 
-def list_auth_events(db: Session, limit: int = 200):
-    return (
+def delete_tokens_batch(db: Session, model, condition, after_id: UUID | None, batch_size: int) -> list[UUID]:
+    table = model.__table__
+    batch = select(table.c.id).where(condition).order_by(table.c.id).limit(batch_size)
+    if after_id is not None:
+        batch = batch.where(table.c.id > after_id)
+    batch = batch.with_for_update(skip_locked=True).cte("batch")
+    result = db.execute(delete(table).where(table.c.id == batch.c.id).returning(table.c.id))
+    return [row.id for row in result]
+
+
+def list_auth_events(
+    db: Session,
+    limit: int = 200,
+    before: tuple[datetime, UUID] | None = None,
+    user_id: UUID | None = None,
+    service_id: UUID | None = None,
+    event_type: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+):
+    query = (
         db.query(models.AuthEvent, models.User, models.Service)
         .outerjoin(models.User, models.AuthEvent.user_id == models.User.id)
         .outerjoin(models.Service, models.AuthEvent.service_id == models.Service.id)
-        .order_by(models.AuthEvent.created_at.desc())
+    )
+    if user_id is not None:
+        query = query.filter(models.AuthEvent.user_id == user_id)
+    if service_id is not None:
+        query = query.filter(models.AuthEvent.service_id == service_id)
+    if event_type:
+        query = query.filter(models.AuthEvent.event_type == event_type)
+    if since is not None:
+        query = query.filter(models.AuthEvent.created_at >= since)
+    if until is not None:
+        query = query.filter(models.AuthEvent.created_at < until)
+    if before is not None:
+        query = query.filter(tuple_(models.AuthEvent.created_at, models.AuthEvent.id) < tuple_(*before))
+    return (
+        query.order_by(models.AuthEvent.created_at.desc(), models.AuthEvent.id.desc())
         .limit(limit)
         .all()
     )
 
 
-def count_users(db: Session) -> int:
-    return db.query(func.count(models.User.id)).scalar() or 0
-
-
-def count_services(db: Session) -> int:
-    return db.query(func.count(models.Service.id)).scalar() or 0
-
-
-def count_service_api_keys(db: Session) -> int:
-    return db.query(func.count(models.ServiceApiKey.id)).scalar() or 0
-
-
-def count_auth_events(db: Session) -> int:
-    return db.query(func.count(models.AuthEvent.id)).scalar() or 0
-
-
-def count_by_period(db: Session, model, date_field, period: str, start, end):
+def stream_auth_events(
+    db: Session,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    service_id: UUID | None = None,
+):
+    event = models.AuthEvent
+    stmt = (
+        select(
+            event.id,
+            event.created_at,
+            event.event_type,
+            event.user_id,
+            models.User.email.label("user_email"),
+            event.service_id,
+            models.Service.name.label("service_name"),
+            event.ip_address,
+        )
+        .outerjoin(models.User, event.user_id == models.User.id)
+        .outerjoin(models.Service, event.service_id == models.Service.id)
+        .order_by(event.created_at, event.id)
+    )
+    if since is not None:
+        stmt = stmt.where(event.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(event.created_at < until)
+    if service_id is not None:
+        stmt = stmt.where(event.service_id == service_id)
+    return db.execute(stmt.execution_options(yield_per=settings.export_batch_size))
+
+
+def stream_users(db: Session, since: datetime | None = None, until: datetime | None = None):
+    user = models.User
+    stmt = select(
+        user.id,
+        user.email,
+        user.phone,
+        user.is_active,
+        user.email_verified,
+        user.created_at,
+        user.last_event_at,
+        user.last_event_type,
+        user.last_service_id,
+    ).order_by(user.created_at, user.id)
+    if since is not None:
+        stmt = stmt.where(user.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(user.created_at < until)
+    return db.execute(stmt.execution_options(yield_per=settings.export_batch_size))
+
+
+def list_auth_event_types(db: Session) -> list[str]:
+    return [
+        row.event_type
+        for row in db.query(models.AuthEventDailyCount.event_type)
+        .distinct()
+        .order_by(models.AuthEventDailyCount.event_type)
+    ]
+
+
+def count_totals(db: Session) -> dict[str, int]:
+    totals = {
+        row.entity: row.total
+        for row in db.query(
+            models.DailyEntityCount.entity,
+            func.sum(models.DailyEntityCount.created - models.DailyEntityCount.deleted).label("total"),
+        ).group_by(models.DailyEntityCount.entity)
+    }
+    totals["auth_events"] = db.query(func.sum(models.AuthEventDailyCount.count)).scalar() or 0
+    return totals
+
+
+def count_by_period(db: Session, day_field, count_field, period: str, start, end, criteria=()):
     rows = (
         db.query(
-            func.date_trunc(period, date_field).label("bucket"),
-            func.count(model.id).label("count"),
+            func.date_trunc(period, cast(day_field, DateTime)).label("bucket"),
+            func.sum(count_field).label("count"),
         )
-        .filter(date_field >= start, date_field < end)
+        .filter(day_field >= start.date(), day_field < end.date(), *criteria)
         .group_by("bucket")
         .order_by("bucket")
         .all()
     )
-    return {row.bucket: row.count for row in rows}
+    return {row.bucket.replace(tzinfo=timezone.utc): row.count for row in rows}
+
+
+def rebuild_rollups(db: Session):
+    # Block event and entity writers for the duration so the rebuilt counts are exact.
+    db.execute(text("LOCK TABLE auth_event_daily_counts, daily_entity_counts IN SHARE ROW EXCLUSIVE MODE"))
+    db.execute(text("DELETE FROM auth_event_daily_counts"))
+    db.execute(text("DELETE FROM daily_entity_counts"))
+    db.execute(
+        text(
+            "INSERT INTO auth_event_daily_counts (day, service_id, event_type, count) "
+            "SELECT (created_at AT TIME ZONE 'UTC')::date, COALESCE(service_id, CAST(:no_service_id AS uuid)), "
+            "event_type, count(*) FROM auth_events GROUP BY 1, 2, 3"
+        ),
+        {"no_service_id": str(models.NO_SERVICE_ID)},
+    )
+    for entity, model in (
+        ("users", models.User),
+        ("services", models.Service),
+        ("service_api_keys", models.ServiceApiKey),
+    ):
+        db.execute(
+            text(
+                "INSERT INTO daily_entity_counts (day, entity, created, deleted) "
+                "SELECT (COALESCE(created_at, now()) AT TIME ZONE 'UTC')::date, :entity, count(*), 0 "
+                f"FROM {model.__tablename__} GROUP BY 1"
+            ),
+            {"entity": entity},
+        )
@@ -0,0 +1,102 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import auth, hashing, models, statements, user_cache
+from .config import settings
+
+
+async def get_user_by_identifier(db: AsyncSession, identifier: str):
+    for statement, params in statements.user_lookups(identifier):
+        result = await db.execute(statement, params)
+        user = result.scalars().first()
+        if user is not None:
+            return user
+    return None
+
+
+async def get_user_by_id(db: AsyncSession, user_id: UUID):
+    result = await db.execute(statements.USER_BY_ID, {"user_id": user_id})
+    return result.scalars().first()
+
+
+async def get_users_by_ids(db: AsyncSession, user_ids):
+    result = await db.execute(select(models.User).where(models.User.id.in_(list(user_ids))))
+    return result.scalars().all()
+
+
+async def authenticate_user(db: AsyncSession, identifier: str, password: str):
+    user = await get_user_by_identifier(db, identifier)
+    if not user:
+        return None
+    if not await hashing.verify_password(password, user.hashed_password):
+        return None
+    new_hash = await hashing.rehash_if_needed(password, user.hashed_password)
+    if new_hash:
+        # Left pending on the session so it is written by the commit that records the login.
+        user.hashed_password = new_hash
+    return user
+
+
+async def create_refresh_token(db: AsyncSession, user_id: UUID):
+    token = auth.generate_refresh_token()
+    expires_at = datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expire_days)
+    db_token = models.RefreshToken(
+        user_id=user_id,
+        token_hash=auth.hash_refresh_token(token),
+        expires_at=expires_at,
+    )
+    db.add(db_token)
+    await db.flush()
+    return token, db_token
+
+
+async def get_refresh_token(db: AsyncSession, token: str):
+    token_hash = auth.hash_refresh_token(token)
+    result = await db.execute(statements.REFRESH_TOKEN_BY_HASH, {"token_hash": token_hash})
+    return result.scalars().first()
+
+
+async def revoke_refresh_token(db: AsyncSession, db_token: models.RefreshToken):
+    db_token.revoked = True
+    await db.flush()
+    return db_token
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> tuple[str, UUID, int] | None:
+    new_token = auth.generate_refresh_token()
+    result = await db.execute(
+        statements.ROTATE_REFRESH_TOKEN,
+        {
+            "presented_hash": auth.hash_refresh_token(token),
+            "new_id": uuid.uuid4(),
+            "new_token_hash": auth.hash_refresh_token(new_token),
+            "new_expires_at": datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expire_days),
+        },
+    )
+    row = result.first()
+    if row is None:
+        return None
+    return new_token, row.user_id, row.token_generation
+
+
+async def revoke_refresh_token_family(db: AsyncSession, token: str) -> int:
+    result = await db.execute(
+        statements.REVOKE_REFRESH_TOKEN_FAMILY,
+        {"presented_hash": auth.hash_refresh_token(token)},
+    )
+    return result.rowcount
+
+
+async def revoke_all_sessions(db: AsyncSession, user_id: UUID) -> int:
+    result = await db.execute(statements.REVOKE_ALL_SESSIONS, {"target_user_id": user_id})
+    user_cache.invalidate_on_commit(db.sync_session, user_id)
+    return result.rowcount
+
+
+async def get_service_api_key_by_hash(db: AsyncSession, key_hash: str):
+    result = await db.execute(statements.SERVICE_API_KEY_BY_HASH, {"key_hash": key_hash})
+    return result.scalars().first()
@@ -1,10 +1,68 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from .config import settings
 from .base import Base
+from . import db_pool
 
-engine = create_engine(settings.database_url, future=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
+engine = create_engine(
+    settings.database_url,
+    future=True,
+    connect_args=db_pool.psycopg2_connect_args(),
+    **db_pool.engine_options(),
+)
+db_pool.instrument(engine)
+# Writers only flush and the request commits once; objects stay loaded after that commit.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine, future=True)
+
+if settings.read_database_url:
+    read_engine = create_engine(
+        settings.read_database_url,
+        future=True,
+        connect_args=db_pool.psycopg2_connect_args(),
+        **db_pool.engine_options(),
+    )
+    db_pool.instrument(read_engine)
+else:
+    read_engine = engine
+# Read sessions run in READ ONLY transactions, so even Core writes fail on the primary fallback.
+ReadSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=read_engine.execution_options(postgresql_readonly=True),
+    future=True,
+)
+
+
+@event.listens_for(ReadSessionLocal, "before_flush")
+def _reject_read_session_writes(session, flush_context, instances):
+    raise RuntimeError("Read-only session cannot write")
+
+
+def _async_database_url():
+    if settings.async_database_url:
+        url = make_url(settings.async_database_url)
+    else:
+        url = make_url(settings.database_url).set(drivername="postgresql+asyncpg")
+        # asyncpg takes "ssl" where libpq takes "sslmode".
+        sslmode = url.query.get("sslmode")
+        if sslmode:
+            url = url.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    if "prepared_statement_cache_size" not in url.query:
+        # Per-connection cache of server-side prepared statements kept by the asyncpg dialect.
+        url = url.update_query_dict({"prepared_statement_cache_size": str(settings.db_prepared_statement_cache_size)})
+    return url
+
+
+async_engine = create_async_engine(
+    _async_database_url(),
+    connect_args=db_pool.asyncpg_connect_args(),
+    **db_pool.engine_options(),
+)
+db_pool.instrument(async_engine.sync_engine)
+# Async callers cannot lazy-load expired attributes, so objects stay usable after commit.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 
 def init_db():
@@ -18,3 +76,16 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,106 @@
+import threading
+import time
+import weakref
+
+from sqlalchemy import event
+
+from .config import settings
+
+
+class _CheckoutStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkouts_at_limit = 0
+        self.checkins = 0
+        self.total_held_ms = 0.0
+        self.max_held_ms = 0.0
+
+    def connected(self) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def checked_out(self, at_limit: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            if at_limit:
+                self.checkouts_at_limit += 1
+
+    def checked_in(self, held_ms: float) -> None:
+        with self._lock:
+            self.checkins += 1
+            self.total_held_ms += held_ms
+            self.max_held_ms = max(self.max_held_ms, held_ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkouts_at_limit": self.checkouts_at_limit,
+                "avg_held_ms": round(self.total_held_ms / self.checkins, 3) if self.checkins else 0.0,
+                "max_held_ms": round(self.max_held_ms, 3),
+            }
+
+
+_checkout_stats = weakref.WeakKeyDictionary()
+
+
+def instrument(engine) -> None:
+    # Listeners on the engine rather than its pool carry over when dispose() replaces the pool.
+    stats = _checkout_stats[engine] = _CheckoutStats()
+    limit = settings.db_pool_size + settings.db_max_overflow
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        stats.connected()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        # Every slot is taken once this one is handed out, so the next caller will wait.
+        stats.checked_out(at_limit=engine.pool.checkedout() >= limit)
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            stats.checked_in((time.perf_counter() - checked_out_at) * 1000)
+
+
+def engine_options() -> dict:
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def psycopg2_connect_args() -> dict:
+    if not settings.db_statement_timeout_ms:
+        return {}
+    return {"options": f"-c statement_timeout={settings.db_statement_timeout_ms}"}
+
+
+def asyncpg_connect_args() -> dict:
+    if not settings.db_statement_timeout_ms:
+        return {}
+    return {"server_settings": {"statement_timeout": str(settings.db_statement_timeout_ms)}}
+
+
+def pool_stats(engine) -> dict:
+    pool = engine.pool
+    stats = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": settings.db_max_overflow,
+    }
+    checkout_stats = _checkout_stats.get(engine)
+    if checkout_stats is not None:
+        stats.update(checkout_stats.snapshot())
+    return stats
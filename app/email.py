@@ -4,10 +4,7 @@ from email.message import EmailMessage
 from .config import settings
 
 
-def send_email(to_email: str, subject: str, body: str, html_body: str | None = None) -> None:
-    if not settings.smtp_host or not settings.smtp_user or not settings.smtp_password:
-        raise ValueError("SMTP credentials are not configured")
-
+def build_message(to_email: str, subject: str, body: str, html_body: str | None = None) -> EmailMessage:
     from_email = settings.smtp_from_email or settings.smtp_user
     message = EmailMessage()
     message["Subject"] = subject
@@ -16,11 +13,26 @@ def send_email(to_email: str, subject: str, body: str, html_body: str | None = N
     message.set_content(body)
     if html_body:
         message.add_alternative(html_body, subtype="html")
+    return message
+
+
+def connect() -> smtplib.SMTP:
+    if not settings.smtp_host:
+        raise ValueError("SMTP host is not configured")
+    if not settings.smtp_from_email and not settings.smtp_user:
+        raise ValueError("SMTP sender is not configured")
 
-    with smtplib.SMTP(settings.smtp_host, settings.smtp_port) as server:
-        server.starttls()
-        server.login(settings.smtp_user, settings.smtp_password)
-        server.send_message(message)
+    server = smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=settings.smtp_timeout_seconds)
+    try:
+        # Both are optional so a local SMTP sink without TLS or auth can be used in development and tests.
+        if settings.smtp_starttls:
+            server.starttls()
+        if settings.smtp_user and settings.smtp_password:
+            server.login(settings.smtp_user, settings.smtp_password)
+    except BaseException:
+        server.close()
+        raise
+    return server
 
 
 def build_verification_email(
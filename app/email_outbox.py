@@ -0,0 +1,144 @@
+import itertools
+import logging
+import smtplib
+import threading
+from datetime import datetime, timedelta, timezone
+
+from . import crud, email
+from .background import PeriodicWorker
+from .config import settings
+from .db import SessionLocal
+
+logger = logging.getLogger("app.email_outbox")
+
+_stopping = threading.Event()
+_stats_lock = threading.Lock()
+_stats = {"sent": 0, "retried": 0, "failed": 0}
+
+
+def deliver(batch_size: int | None = None) -> dict[str, int]:
+    if batch_size is None:
+        batch_size = settings.email_outbox_batch_size
+    totals = {"sent": 0, "retried": 0, "failed": 0}
+    if not settings.smtp_host:
+        # Rows wait in the outbox until SMTP is configured instead of burning their attempts.
+        return totals
+    while not _stopping.is_set():
+        db = SessionLocal()
+        try:
+            rows = crud.claim_outbox_emails(db, batch_size, settings.email_outbox_lease_seconds)
+            db.commit()
+            if not rows:
+                break
+            sent, failures = _send_batch(rows)
+            if sent:
+                crud.mark_outbox_sent(db, sent)
+                totals["sent"] += len(sent)
+            for row, exc, permanent in failures:
+                error = f"{type(exc).__name__}: {exc}"[:1000]
+                if permanent or row.attempts >= settings.email_outbox_max_attempts:
+                    crud.mark_outbox_failed(db, row.id, error)
+                    totals["failed"] += 1
+                    logger.warning(
+                        "giving up on email %s to %s after %s attempts: %s", row.id, row.to_email, row.attempts, error
+                    )
+                else:
+                    crud.mark_outbox_retry(db, row.id, error, _next_attempt_at(row.attempts))
+                    totals["retried"] += 1
+            db.commit()
+        finally:
+            db.close()
+        if len(rows) < batch_size:
+            break
+    with _stats_lock:
+        for key, count in totals.items():
+            _stats[key] += count
+    return totals
+
+
+def _send_batch(rows) -> tuple[list, list]:
+    sent = []
+    failures = []
+    server = None
+    try:
+        for index, row in enumerate(rows):
+            if server is None:
+                try:
+                    server = email.connect()
+                except (smtplib.SMTPException, OSError, ValueError) as exc:
+                    # The server is unreachable or misconfigured; the rest of the batch would fail the same way.
+                    failures.extend((pending, exc, False) for pending in rows[index:])
+                    break
+            try:
+                server.send_message(email.build_message(row.to_email, row.subject, row.body, row.html_body))
+            except (smtplib.SMTPException, OSError, ValueError) as exc:
+                failures.append((row, exc, _is_permanent(exc)))
+                # Keep the connection across rejected messages; reconnect for the next one after anything else.
+                if not isinstance(exc, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                    _close(server)
+                    server = None
+            else:
+                sent.append(row.id)
+    finally:
+        _close(server)
+    return sent, failures
+
+
+def _is_permanent(exc: Exception) -> bool:
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return exc.smtp_code >= 500
+    return False
+
+
+def _close(server) -> None:
+    if server is None:
+        return
+    try:
+        server.quit()
+    except (smtplib.SMTPException, OSError):
+        server.close()
+
+
+def _next_attempt_at(attempts: int) -> datetime:
+    delay = min(
+        settings.email_outbox_retry_base_seconds * 2 ** (attempts - 1),
+        settings.email_outbox_retry_max_seconds,
+    )
+    return datetime.now(timezone.utc) + timedelta(seconds=delay)
+
+
+def stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+
+# Several senders so one slow SMTP round trip does not hold up the rest of the queue; SKIP LOCKED keeps
+# them (and other uvicorn workers) from claiming the same rows. Undelivered rows stay in the table
+# across restarts, so there is no shutdown run.
+workers = [
+    PeriodicWorker(f"email-outbox-{index}", settings.email_outbox_poll_seconds, deliver, run_on_stop=False)
+    for index in range(settings.email_outbox_workers)
+]
+
+_next_worker = itertools.cycle(workers)
+
+
+def start() -> None:
+    _stopping.clear()
+    for worker in workers:
+        worker.start()
+
+
+def wake() -> None:
+    # Called after the enqueuing transaction commits, so new mail goes out without waiting for the poll.
+    if workers:
+        next(_next_worker).wake()
+
+
+def stop() -> None:
+    _stopping.set()
+    for worker in workers:
+        worker.stop()
+    _stopping.clear()
@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+from datetime import datetime
+from uuid import UUID
+
+from . import crud
+from .db import ReadSessionLocal
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def _open_result(db, kind: str, since: datetime | None, until: datetime | None, service_id: UUID | None):
+    if kind == "events":
+        return crud.stream_auth_events(db, since=since, until=until, service_id=service_id)
+    if kind == "users":
+        return crud.stream_users(db, since=since, until=until)
+    raise ValueError("Unsupported export")
+
+
+def iter_export(
+    kind: str,
+    fmt: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    service_id: UUID | None = None,
+):
+    # Owns its session: a StreamingResponse body keeps running after request dependencies are closed.
+    if fmt not in FORMATS:
+        raise ValueError("Unsupported format")
+    db = ReadSessionLocal()
+    try:
+        result = _open_result(db, kind, since, until, service_id)
+        columns = list(result.keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == "csv":
+            writer.writerow(columns)
+        for rows in result.partitions():
+            for row in rows:
+                values = [_serialize(value) for value in row]
+                if fmt == "csv":
+                    writer.writerow(["" if value is None else value for value in values])
+                else:
+                    buffer.write(json.dumps(dict(zip(columns, values))))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if fmt == "csv" and buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
@@ -0,0 +1,105 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+from .admission import AdmissionController, OverloadedError
+from .config import settings
+
+
+def _build_pwd_context() -> CryptContext:
+    argon2_options = {
+        f"argon2__{name}": value
+        for name, value in (
+            ("time_cost", settings.argon2_time_cost),
+            ("memory_cost", settings.argon2_memory_cost),
+            ("parallelism", settings.argon2_parallelism),
+        )
+        if value is not None
+    }
+    return CryptContext(schemes=["argon2"], deprecated="auto", **argon2_options)
+
+
+pwd_context = _build_pwd_context()
+
+_executor: ProcessPoolExecutor | None = None
+_admission: AdmissionController | None = None
+
+
+def _worker_count() -> int:
+    return settings.password_hash_workers or os.cpu_count() or 1
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
+
+
+def start_executor() -> None:
+    global _executor, _admission
+    if _executor is not None:
+        return
+    workers = _worker_count()
+    # Workers start lazily on the first hash, after lifespan has started background threads and DB pools;
+    # forking that process can deadlock the child, so they come from a clean forkserver instead.
+    mp_context = multiprocessing.get_context("forkserver")
+    mp_context.set_forkserver_preload([__name__])
+    _executor = ProcessPoolExecutor(max_workers=workers, mp_context=mp_context)
+    # Only hand the pool as many jobs as it has workers; everything else waits
+    # in the admission queue, where depth and wait time are bounded and visible.
+    _admission = AdmissionController(
+        concurrency=workers,
+        max_queue=settings.password_hash_queue_size,
+        max_wait_seconds=settings.password_hash_max_wait_ms / 1000,
+        retry_after=settings.password_hash_retry_after_seconds,
+    )
+
+
+def shutdown_executor() -> None:
+    global _executor, _admission
+    if _executor is None:
+        return
+    _executor.shutdown(wait=True, cancel_futures=True)
+    _executor = None
+    _admission = None
+
+
+def stats() -> dict:
+    if _admission is None:
+        return {"workers": 0}
+    return {"workers": _worker_count(), **_admission.stats()}
+
+
+async def _run(fn, *args):
+    if _executor is None:
+        start_executor()
+    async with _admission.admit():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, fn, *args)
+
+
+def needs_update(hashed_password: str) -> bool:
+    return pwd_context.needs_update(hashed_password)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(_hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    return await _run(_verify, password, hashed_password)
+
+
+async def rehash_if_needed(password: str, hashed_password: str) -> str | None:
+    if not needs_update(hashed_password):
+        return None
+    try:
+        return await hash_password(password)
+    except OverloadedError:
+        # The upgrade is opportunistic; retry on a later login instead of failing this one.
+        return None
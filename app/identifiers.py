@@ -0,0 +1,24 @@
+import re
+
+_PHONE_SEPARATORS_RE = re.compile(r"[\s\-().]")
+_E164_RE = re.compile(r"^\+[1-9]\d{7,14}$")
+
+
+def normalize_email(value: str) -> str:
+    return value.strip().lower()
+
+
+def normalize_phone(value: str) -> str | None:
+    cleaned = _PHONE_SEPARATORS_RE.sub("", value)
+    if cleaned.startswith("00"):
+        cleaned = "+" + cleaned[2:]
+    if not _E164_RE.match(cleaned):
+        return None
+    return cleaned
+
+
+def classify(identifier: str) -> tuple[str, str | None]:
+    # Returns ("email", normalized) or ("phone", E.164 or None when it does not parse).
+    if "@" in identifier:
+        return "email", normalize_email(identifier)
+    return "phone", normalize_phone(identifier)
@@ -0,0 +1,86 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from jose import JWTError, jwk, jwt
+
+from .config import settings
+
+ASYMMETRIC_ALGORITHMS = {"RS256", "RS384", "RS512", "ES256", "ES384", "ES512"}
+
+
+@dataclass(frozen=True)
+class KeyEntry:
+    kid: str
+    algorithm: str
+    private_key: Any | None
+    public_key: Any
+
+
+_keys: dict[str, KeyEntry] | None = None
+_jwks: dict[str, list] = {"keys": []}
+
+
+def is_asymmetric() -> bool:
+    return settings.jwt_algorithm in ASYMMETRIC_ALGORITHMS
+
+
+def load_keys() -> None:
+    global _keys, _jwks
+    if not is_asymmetric():
+        if settings.jwt_algorithm != "HS256":
+            raise ValueError(f"Unsupported JWT algorithm: {settings.jwt_algorithm}")
+        _keys = {}
+        _jwks = {"keys": []}
+        return
+    if not settings.jwt_keys_dir:
+        raise ValueError("JWT_KEYS_DIR is required for asymmetric signing")
+
+    keys = {}
+    for path in sorted(Path(settings.jwt_keys_dir).glob("*.pem")):
+        key = jwk.construct(path.read_text(), settings.jwt_algorithm)
+        kid = path.stem
+        if key.is_public():
+            keys[kid] = KeyEntry(kid, settings.jwt_algorithm, None, key)
+        else:
+            keys[kid] = KeyEntry(kid, settings.jwt_algorithm, key, key.public_key())
+
+    active = keys.get(settings.jwt_active_kid or "")
+    if active is None or active.private_key is None:
+        raise ValueError("JWT_ACTIVE_KID must name a private key in JWT_KEYS_DIR")
+
+    _keys = keys
+    _jwks = {
+        "keys": [
+            {**entry.public_key.to_dict(), "kid": entry.kid, "use": "sig", "alg": entry.algorithm}
+            for entry in keys.values()
+        ]
+    }
+
+
+def _get_keys() -> dict[str, KeyEntry]:
+    if _keys is None:
+        load_keys()
+    return _keys
+
+
+def encode(claims: dict) -> str:
+    if not is_asymmetric():
+        return jwt.encode(claims, settings.secret_key, algorithm="HS256")
+    active = _get_keys()[settings.jwt_active_kid]
+    return jwt.encode(claims, active.private_key, algorithm=active.algorithm, headers={"kid": active.kid})
+
+
+def decode(token: str) -> dict:
+    if not is_asymmetric():
+        return jwt.decode(token, settings.secret_key, algorithms=["HS256"])
+    kid = jwt.get_unverified_header(token).get("kid")
+    entry = _get_keys().get(kid or "")
+    if entry is None:
+        raise JWTError("Unknown signing key")
+    return jwt.decode(token, entry.public_key, algorithms=[entry.algorithm])
+
+
+def get_jwks() -> dict[str, list]:
+    _get_keys()
+    return _jwks
@@ -7,7 +7,8 @@ from slowapi.middleware import SlowAPIMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from contextlib import asynccontextmanager
 
-from . import db
+from . import api_key_usage, auth_events, db, email_outbox, hashing, jwt_keys, metering, partitions, token_reaper
+from .admission import OverloadedError, overloaded_exception_handler
 from .api.v1 import auth as auth_router
 from .api.v1 import admin as admin_router
 from .api.v1 import health as health_router
@@ -21,13 +22,31 @@ from .service_auth import require_service_api_key
 async def lifespan(app: FastAPI):
     # Başlangıçta veritabanı tablolarını oluştur
     db.init_db()
+    partitions.ensure_current_partitions()
+    jwt_keys.load_keys()
+    hashing.start_executor()
+    api_key_usage.worker.start()
+    metering.worker.start()
+    auth_events.worker.start()
+    partitions.worker.start()
+    token_reaper.worker.start()
+    email_outbox.start()
     yield
+    email_outbox.stop()
+    token_reaper.worker.stop()
+    partitions.worker.stop()
+    auth_events.worker.stop()
+    metering.worker.stop()
+    api_key_usage.worker.stop()
+    hashing.shutdown_executor()
+    await db.async_engine.dispose()
 
 
 app = FastAPI(title="Auth Service", lifespan=lifespan, dependencies=[Depends(require_service_api_key)])
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(OverloadedError, overloaded_exception_handler)
 app.add_middleware(SlowAPIMiddleware)
 app.middleware("http")(request_id_middleware)
 if settings.log_file:
@@ -0,0 +1,67 @@
+import threading
+from datetime import datetime, timezone
+from uuid import UUID
+
+from . import crud
+from .background import PeriodicWorker
+from .config import settings
+from .db import SessionLocal
+
+_lock = threading.Lock()
+# (service_id, route, minute) -> [request_count, error_count, total_duration_ms]
+_buckets: dict[tuple[UUID, str, datetime], list] = {}
+
+
+def record(service_id: UUID, route: str, status_code: int, duration_ms: float) -> None:
+    minute = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    key = (service_id, route, minute)
+    with _lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = _buckets[key] = [0, 0, 0.0]
+        bucket[0] += 1
+        if status_code >= 400:
+            bucket[1] += 1
+        bucket[2] += duration_ms
+
+
+def pending_count() -> int:
+    with _lock:
+        return len(_buckets)
+
+
+def flush() -> int:
+    global _buckets
+    with _lock:
+        batch, _buckets = _buckets, {}
+    if not batch:
+        return 0
+    rows = [
+        {
+            "service_id": service_id,
+            "route": route,
+            "minute": minute,
+            "request_count": count,
+            "error_count": errors,
+            "total_duration_ms": duration_ms,
+        }
+        for (service_id, route, minute), (count, errors, duration_ms) in batch.items()
+    ]
+    db = SessionLocal()
+    try:
+        crud.upsert_service_usage(db, rows)
+        db.commit()
+    except Exception:
+        with _lock:
+            for key, (count, errors, duration_ms) in batch.items():
+                bucket = _buckets.setdefault(key, [0, 0, 0.0])
+                bucket[0] += count
+                bucket[1] += errors
+                bucket[2] += duration_ms
+        raise
+    finally:
+        db.close()
+    return len(rows)
+
+
+worker = PeriodicWorker("metering-flush", settings.metering_flush_seconds, flush)
@@ -1,21 +1,35 @@
 import uuid
 
-from sqlalchemy import Column, String, Boolean, DateTime, func, ForeignKey, UniqueConstraint
+from sqlalchemy import BigInteger, Column, Date, String, Boolean, DateTime, Float, Index, Integer, func, text, ForeignKey, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from .base import Base
 
+# Rollup rows for events without a calling service use this id, so it can be part of the primary key.
+NO_SERVICE_ID = uuid.UUID(int=0)
+
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (Index("ix_users_created_at_id", "created_at", "id"),)
 
     id = Column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
     email = Column(String, unique=True, index=True, nullable=True)
     phone = Column(String, unique=True, index=True, nullable=True)
+    # Lookup keys from app.identifiers; NULL for legacy duplicates and phones that are not E.164.
+    email_normalized = Column(String, unique=True, index=True, nullable=True)
+    phone_e164 = Column(String, unique=True, index=True, nullable=True)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     email_verified = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Carried as the "gen" access token claim; bumped to revoke every session at once.
+    token_generation = Column(Integer, nullable=False, default=0, server_default="0")
+    # Denormalized from auth_events by crud.insert_auth_events for the admin users page.
+    last_event_at = Column(DateTime(timezone=True), nullable=True)
+    last_event_type = Column(String, nullable=True)
+    last_service_id = Column(UUID(as_uuid=True), ForeignKey("services.id", ondelete="SET NULL"), nullable=True)
+    last_service = relationship("Service")
     refresh_tokens = relationship(
         "RefreshToken",
         back_populates="user",
@@ -48,6 +62,8 @@ class RefreshToken(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Shared by every token rotated from the same login; presenting a revoked token revokes the family.
+    family_id = Column(UUID(as_uuid=True), nullable=False, index=True, default=uuid.uuid4)
     token_hash = Column(String, unique=True, nullable=False, index=True)
     revoked = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -82,15 +98,48 @@ class PasswordResetToken(Base):
     user = relationship("User", back_populates="password_reset_tokens")
 
 
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    # Only undelivered rows are scanned by app.email_outbox when claiming work.
+    __table_args__ = (
+        Index(
+            "ix_email_outbox_pending_next_attempt_at",
+            "next_attempt_at",
+            postgresql_where=text("sent_at IS NULL AND failed_at IS NULL"),
+        ),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(String, nullable=False)
+    html_body = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(String, nullable=True)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    failed_at = Column(DateTime(timezone=True), nullable=True)
+
+
 class AuthEvent(Base):
     __tablename__ = "auth_events"
+    # Monthly range partitions (auth_events_pYYYY_MM) are managed by app.partitions.
+    # Composite (..., created_at, id) indexes back keyset pagination of the admin events page.
+    __table_args__ = (
+        Index("ix_auth_events_created_at_id", "created_at", "id"),
+        Index("ix_auth_events_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_auth_events_service_id_created_at_id", "service_id", "created_at", "id"),
+        Index("ix_auth_events_event_type_created_at_id", "event_type", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     event_type = Column(String, nullable=False)
     ip_address = Column(String, nullable=True)
     service_id = Column(UUID(as_uuid=True), ForeignKey("services.id", ondelete="SET NULL"), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
 
     user = relationship("User", back_populates="auth_events")
     service = relationship("Service", back_populates="auth_events")
@@ -142,3 +191,32 @@ class ServiceApiKey(Base):
     last_used_at = Column(DateTime(timezone=True), nullable=True)
 
     service = relationship("Service", back_populates="api_keys")
+
+
+class ServiceUsageMinutely(Base):
+    __tablename__ = "service_usage_minutely"
+
+    service_id = Column(UUID(as_uuid=True), ForeignKey("services.id", ondelete="CASCADE"), primary_key=True)
+    route = Column(String, primary_key=True)
+    minute = Column(DateTime(timezone=True), primary_key=True, index=True)
+    request_count = Column(Integer, nullable=False, default=0)
+    error_count = Column(Integer, nullable=False, default=0)
+    total_duration_ms = Column(Float, nullable=False, default=0)
+
+
+class AuthEventDailyCount(Base):
+    __tablename__ = "auth_event_daily_counts"
+
+    day = Column(Date, primary_key=True)
+    service_id = Column(UUID(as_uuid=True), primary_key=True)
+    event_type = Column(String, primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+
+
+class DailyEntityCount(Base):
+    __tablename__ = "daily_entity_counts"
+
+    day = Column(Date, primary_key=True)
+    entity = Column(String, primary_key=True)
+    created = Column(BigInteger, nullable=False, default=0)
+    deleted = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,100 @@
+import logging
+import re
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .background import PeriodicWorker
+from .config import settings
+from .db import SessionLocal
+
+logger = logging.getLogger("app.partitions")
+
+PARENT_TABLE = "auth_events"
+PARTITION_NAME_RE = re.compile(r"^auth_events_p(\d{4})_(\d{2})$")
+
+
+def _month_start(dt: datetime) -> datetime:
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(dt: datetime, months: int) -> datetime:
+    year = dt.year + (dt.month - 1 + months) // 12
+    month = (dt.month - 1 + months) % 12 + 1
+    return dt.replace(year=year, month=month)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{PARENT_TABLE}_p{month.year:04d}_{month.month:02d}"
+
+
+def list_partitions(db: Session) -> list[str]:
+    rows = db.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :parent ORDER BY child.relname"
+        ),
+        {"parent": PARENT_TABLE},
+    )
+    return [row[0] for row in rows]
+
+
+def ensure_partitions(db: Session, months_ahead: int | None = None) -> list[str]:
+    if months_ahead is None:
+        months_ahead = settings.auth_event_partitions_ahead
+    existing = set(list_partitions(db))
+    current = _month_start(datetime.now(timezone.utc))
+    created = []
+    for offset in range(months_ahead + 1):
+        start = _add_months(current, offset)
+        name = partition_name(start)
+        if name in existing:
+            continue
+        end = _add_months(start, 1)
+        db.execute(
+            text(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARENT_TABLE} '
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        )
+        created.append(name)
+    db.commit()
+    return created
+
+
+def prune_partitions(db: Session, retention_months: int | None = None, detach_only: bool = False) -> list[str]:
+    if retention_months is None:
+        retention_months = settings.auth_event_retention_months
+    cutoff = _add_months(_month_start(datetime.now(timezone.utc)), -retention_months)
+    pruned = []
+    for name in list_partitions(db):
+        match = PARTITION_NAME_RE.match(name)
+        if not match:
+            continue
+        start = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+        if _add_months(start, 1) > cutoff:
+            continue
+        db.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{name}"'))
+        if not detach_only:
+            db.execute(text(f'DROP TABLE "{name}"'))
+        pruned.append(name)
+    db.commit()
+    return pruned
+
+
+def ensure_current_partitions() -> None:
+    db = SessionLocal()
+    try:
+        created = ensure_partitions(db)
+    finally:
+        db.close()
+    if created:
+        logger.info("created auth_events partitions: %s", ", ".join(created))
+
+
+# Keeps the months-ahead window filled even if the maintenance script is not scheduled;
+# pruning old partitions is destructive and only happens through the script.
+worker = PeriodicWorker("auth-event-partitions", 24 * 60 * 60, ensure_current_partitions)
@@ -4,6 +4,8 @@ import uuid
 
 from fastapi import Request
 
+from . import metering
+
 
 async def request_id_middleware(request: Request, call_next):
     logger = logging.getLogger("app.request")
@@ -15,6 +17,10 @@ async def request_id_middleware(request: Request, call_next):
     service_id = getattr(request.state, "service_id", None)
     service = getattr(request.state, "service", None)
     service_name = getattr(service, "name", None) if service else None
+    if service_id:
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        metering.record(service_id, f"{request.method} {route_path}", response.status_code, duration_ms)
     logger.info(
         "%s %s %s %.2fms request_id=%s service_id=%s service_name=%s",
         request.method,
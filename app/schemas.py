@@ -1,7 +1,7 @@
 import re
 
 from pydantic import BaseModel, EmailStr, ConfigDict, field_validator, model_validator
-from typing import Optional
+from typing import Any, Optional
 from datetime import datetime
 from uuid import UUID
 
@@ -59,6 +59,21 @@ class RefreshTokenRequest(BaseModel):
     refresh_token: str
 
 
+class TokenIntrospectionRequest(BaseModel):
+    tokens: list[str]
+
+
+class TokenIntrospectionResult(BaseModel):
+    active: bool
+    sub: Optional[UUID] = None
+    exp: Optional[int] = None
+    claims: Optional[dict[str, Any]] = None
+
+
+class TokenIntrospectionResponse(BaseModel):
+    results: list[TokenIntrospectionResult]
+
+
 class TokenData(BaseModel):
     email: Optional[str] = None
 
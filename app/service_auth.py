@@ -1,16 +1,76 @@
+from dataclasses import dataclass
+from uuid import UUID
+
 from fastapi import Depends, Header, HTTPException, Request, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from . import crud
-from .db import get_db
+from . import api_key_usage, crud_async
+from .auth import hash_token
+from .cache import MISSING, TTLCache
+from .config import settings
+from .db import get_async_db
 
 API_KEY_HEADER = "X-API-Key"
 
 
-def require_service_api_key(
+@dataclass(frozen=True, slots=True)
+class ServiceSnapshot:
+    id: UUID
+    name: str
+    verification_method: str
+    is_active: bool
+
+
+@dataclass(frozen=True, slots=True)
+class ApiKeySnapshot:
+    id: UUID
+    is_active: bool
+    service: ServiceSnapshot
+
+
+_api_key_cache = TTLCache(settings.api_key_cache_size, settings.api_key_cache_ttl_seconds)
+# Unknown keys live in their own cache so guessing random keys cannot evict real ones.
+_unknown_api_key_cache = TTLCache(settings.api_key_cache_size, settings.api_key_cache_negative_ttl_seconds)
+
+
+async def _lookup_api_key(db: AsyncSession, key_hash: str) -> ApiKeySnapshot | None:
+    snapshot = _api_key_cache.get(key_hash)
+    if snapshot is not MISSING:
+        return snapshot
+    if _unknown_api_key_cache.get(key_hash) is not MISSING:
+        return None
+    api_key = await crud_async.get_service_api_key_by_hash(db, key_hash)
+    if api_key is None:
+        _unknown_api_key_cache.set(key_hash, True)
+        return None
+    service = api_key.service
+    snapshot = ApiKeySnapshot(
+        id=api_key.id,
+        is_active=api_key.is_active,
+        service=ServiceSnapshot(
+            id=service.id,
+            name=service.name,
+            verification_method=service.verification_method,
+            is_active=service.is_active,
+        ),
+    )
+    _api_key_cache.set(key_hash, snapshot)
+    return snapshot
+
+
+def invalidate_api_key(key_hash: str) -> None:
+    _api_key_cache.invalidate(key_hash)
+    _unknown_api_key_cache.invalidate(key_hash)
+
+
+def api_key_cache_stats() -> dict:
+    return {**_api_key_cache.stats(), "unknown": _unknown_api_key_cache.stats()}
+
+
+async def require_service_api_key(
     request: Request,
     x_api_key: str | None = Header(default=None, alias=API_KEY_HEADER),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if (
         request.url.path.startswith("/admin")
@@ -26,6 +86,8 @@ def require_service_api_key(
         "/auth/password/reset",
         "/google/callback",
         "/auth/google/callback",
+        "/.well-known/jwks.json",
+        "/auth/.well-known/jwks.json",
     }:
         return None
     if not x_api_key:
@@ -33,13 +95,13 @@ def require_service_api_key(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="API key required",
         )
-    api_key = crud.get_service_api_key(db, x_api_key)
+    api_key = await _lookup_api_key(db, hash_token(x_api_key))
     if not api_key or not api_key.is_active or not api_key.service.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key",
         )
-    crud.touch_service_api_key(db, api_key)
+    api_key_usage.record(api_key.id)
     request.state.service = api_key.service
-    request.state.service_id = api_key.service_id
+    request.state.service_id = api_key.service.id
     return api_key.service
@@ -0,0 +1,111 @@
+from sqlalchemy import Boolean, DateTime, String, bindparam, false, func, insert, select, update
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.orm import joinedload
+
+from . import identifiers, models
+
+# Built once at import; callers pass parameters at execute time, so each call skips
+# expression construction and reuses the compiled form from the engine's statement cache.
+
+USER_BY_EMAIL_NORMALIZED = select(models.User).where(models.User.email_normalized == bindparam("email"))
+
+USER_BY_PHONE_E164 = select(models.User).where(models.User.phone_e164 == bindparam("phone"))
+
+# Exact-match lookups; the only way to reach rows whose normalized key is NULL (pre-existing duplicates,
+# non-E.164 phones).
+USER_BY_EMAIL = select(models.User).where(models.User.email == bindparam("email"))
+
+USER_BY_PHONE = select(models.User).where(models.User.phone == bindparam("phone"))
+
+USER_BY_ID = select(models.User).where(models.User.id == bindparam("user_id"))
+
+REFRESH_TOKEN_BY_HASH = select(models.RefreshToken).where(models.RefreshToken.token_hash == bindparam("token_hash"))
+
+_users = models.User.__table__
+_refresh_tokens = models.RefreshToken.__table__
+
+# Bind names in update() statements must not match a column of the updated table: SQLAlchemy claims
+# those names for the SET clause.
+
+# One round trip: revoke the presented token if still valid, insert its successor in the same family and
+# return the user's token_generation for the new access token.
+# Returns no row when the token is unknown, already revoked or expired.
+_rotated = (
+    update(_refresh_tokens)
+    .where(
+        _refresh_tokens.c.token_hash == bindparam("presented_hash"),
+        _refresh_tokens.c.revoked.is_(false()),
+        _refresh_tokens.c.expires_at > func.now(),
+    )
+    .values(revoked=True)
+    .returning(_refresh_tokens.c.user_id, _refresh_tokens.c.family_id)
+    .cte("rotated")
+)
+_inserted = (
+    insert(_refresh_tokens)
+    .from_select(
+        ["id", "user_id", "family_id", "token_hash", "revoked", "expires_at"],
+        select(
+            bindparam("new_id", type_=PGUUID(as_uuid=True)),
+            _rotated.c.user_id,
+            _rotated.c.family_id,
+            bindparam("new_token_hash", type_=String),
+            bindparam("new_revoked", False, type_=Boolean),
+            bindparam("new_expires_at", type_=DateTime(timezone=True)),
+        ),
+    )
+    .returning(_refresh_tokens.c.user_id, _refresh_tokens.c.family_id)
+    .cte("inserted")
+)
+ROTATE_REFRESH_TOKEN = select(_inserted.c.user_id, _inserted.c.family_id, _users.c.token_generation).join_from(
+    _inserted, _users, _users.c.id == _inserted.c.user_id
+)
+
+REVOKE_REFRESH_TOKEN_FAMILY = (
+    update(_refresh_tokens)
+    .where(
+        _refresh_tokens.c.family_id
+        == select(_refresh_tokens.c.family_id)
+        .where(_refresh_tokens.c.token_hash == bindparam("presented_hash"))
+        .scalar_subquery(),
+        _refresh_tokens.c.revoked.is_(false()),
+    )
+    .values(revoked=True)
+)
+
+# Log out everywhere: bumping token_generation invalidates every access token already issued
+# (checked in auth.get_current_user) and the same statement revokes all live refresh tokens.
+_bumped = (
+    update(_users)
+    .where(_users.c.id == bindparam("target_user_id"))
+    .values(token_generation=_users.c.token_generation + 1)
+    .returning(_users.c.id)
+    .cte("bumped")
+)
+REVOKE_ALL_SESSIONS = (
+    update(_refresh_tokens)
+    .add_cte(_bumped)
+    .where(_refresh_tokens.c.user_id == _bumped.c.id, _refresh_tokens.c.revoked.is_(false()))
+    .values(revoked=True)
+)
+
+SERVICE_API_KEY_BY_HASH = (
+    select(models.ServiceApiKey)
+    .options(joinedload(models.ServiceApiKey.service))
+    .where(models.ServiceApiKey.key_hash == bindparam("key_hash"))
+)
+
+
+def user_lookups(identifier: str) -> list[tuple]:
+    # The exact spelling is probed first: of a set of case or format duplicates only the oldest owns the
+    # normalized key, and it must not shadow a newer account typed exactly as registered.
+    kind, normalized = identifiers.classify(identifier)
+    if kind == "email":
+        return [
+            (USER_BY_EMAIL, {"email": identifier}),
+            (USER_BY_EMAIL_NORMALIZED, {"email": normalized}),
+        ]
+    lookups = [(USER_BY_PHONE, {"phone": identifier})]
+    if normalized:
+        lookups.append((USER_BY_PHONE_E164, {"phone": normalized}))
+    return lookups
@@ -0,0 +1,88 @@
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_
+
+from . import crud, models
+from .background import PeriodicWorker
+from .config import settings
+from .db import SessionLocal
+
+logger = logging.getLogger("app.token_reaper")
+
+_last_run: dict = {}
+
+
+def _targets(now: datetime) -> list[tuple[str, type, object]]:
+    refresh_cutoff = now - timedelta(days=settings.refresh_token_retention_days)
+    verification_cutoff = now - timedelta(hours=settings.email_verification_token_retention_hours)
+    reset_cutoff = now - timedelta(hours=settings.password_reset_token_retention_hours)
+    outbox_cutoff = now - timedelta(hours=settings.email_outbox_retention_hours)
+    return [
+        # Revoked refresh tokens are kept until they expire so a replayed one still triggers reuse detection.
+        ("refresh_tokens", models.RefreshToken, models.RefreshToken.expires_at < refresh_cutoff),
+        (
+            "email_verification_tokens",
+            models.EmailVerificationToken,
+            or_(
+                models.EmailVerificationToken.expires_at < verification_cutoff,
+                models.EmailVerificationToken.used_at < verification_cutoff,
+            ),
+        ),
+        (
+            "password_reset_tokens",
+            models.PasswordResetToken,
+            or_(
+                models.PasswordResetToken.expires_at < reset_cutoff,
+                models.PasswordResetToken.used_at < reset_cutoff,
+            ),
+        ),
+        # Delivered and abandoned mail still holds plaintext verification and reset links.
+        (
+            "email_outbox",
+            models.EmailOutbox,
+            or_(models.EmailOutbox.sent_at < outbox_cutoff, models.EmailOutbox.failed_at < outbox_cutoff),
+        ),
+    ]
+
+
+def reap(batch_size: int | None = None, sleep_ms: int | None = None, dry_run: bool = False) -> dict[str, int]:
+    if batch_size is None:
+        batch_size = settings.token_reaper_batch_size
+    if sleep_ms is None:
+        sleep_ms = settings.token_reaper_batch_sleep_ms
+    deleted = {}
+    for name, model, condition in _targets(datetime.now(timezone.utc)):
+        deleted[name] = 0
+        after_id = None
+        while not worker.stopping:
+            db = SessionLocal()
+            try:
+                ids = crud.delete_tokens_batch(db, model, condition, after_id, batch_size)
+                if dry_run:
+                    db.rollback()
+                else:
+                    db.commit()
+            finally:
+                db.close()
+            if not ids:
+                # Rows locked by other transactions are skipped, so a short batch does not prove the
+                # target is clean; only an empty one ends it.
+                break
+            deleted[name] += len(ids)
+            after_id = max(ids)
+            time.sleep(sleep_ms / 1000)
+    if any(deleted.values()):
+        logger.info("reaped tokens %s", " ".join(f"{name}={count}" for name, count in deleted.items()))
+    if not dry_run:
+        _last_run.update({"finished_at": datetime.now(timezone.utc).isoformat(), "deleted": deleted})
+    return deleted
+
+
+def stats() -> dict:
+    return dict(_last_run)
+
+
+# Skips the shutdown run: a large backlog would hold up shutdown and the next start picks it up.
+worker = PeriodicWorker("token-reaper", settings.token_reaper_interval_seconds, reap, run_on_stop=False)
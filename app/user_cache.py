@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .cache import MISSING, TTLCache
+from .config import settings
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    id: UUID
+    email: str | None
+    phone: str | None
+    is_active: bool
+    email_verified: bool
+    created_at: datetime | None
+    token_generation: int
+
+    @classmethod
+    def from_model(cls, user) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            email=user.email,
+            phone=user.phone,
+            is_active=bool(user.is_active),
+            email_verified=user.email_verified,
+            created_at=user.created_at,
+            token_generation=user.token_generation or 0,
+        )
+
+
+_cache = TTLCache(settings.user_cache_size, settings.user_cache_ttl_seconds)
+
+
+def get(user_id: UUID) -> UserSnapshot | None:
+    snapshot = _cache.get(user_id)
+    if snapshot is MISSING:
+        return None
+    return snapshot
+
+
+def put(user) -> UserSnapshot:
+    snapshot = UserSnapshot.from_model(user)
+    _cache.set(snapshot.id, snapshot)
+    return snapshot
+
+
+def invalidate(user_id: UUID) -> None:
+    _cache.invalidate(user_id)
+
+
+def invalidate_on_commit(session: Session, user_id: UUID) -> None:
+    session.info.setdefault("invalidated_users", set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop("invalidated_users", ()):
+        invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_user_invalidations(session):
+    session.info.pop("invalidated_users", None)
+
+
+def stats() -> dict:
+    return _cache.stats()
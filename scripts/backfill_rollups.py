@@ -0,0 +1,25 @@
+import argparse
+
+from app import crud
+from app.db import SessionLocal
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Rebuild admin dashboard rollup tables from source tables")
+    parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        crud.rebuild_rollups(db)
+        db.commit()
+        totals = crud.count_totals(db)
+    finally:
+        db.close()
+
+    for name, total in sorted(totals.items()):
+        print(f"{name}=", total)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,74 @@
+import argparse
+import time
+import uuid
+
+from sqlalchemy import create_engine, or_
+from sqlalchemy.orm import Session, joinedload
+
+from app import crud, models, statements
+from app.base import Base
+
+TABLES = [
+    models.Service.__table__,
+    models.User.__table__,
+    models.RefreshToken.__table__,
+    models.ServiceApiKey.__table__,
+]
+
+
+def _legacy_lookups(db: Session, identifier: str, user_id, token_hash: str, key_hash: str) -> None:
+    # The db.query(...).filter(...) forms the hot lookups used before switching to prebuilt statements.
+    db.query(models.User).filter(or_(models.User.email == identifier, models.User.phone == identifier)).first()
+    db.query(models.User).filter(models.User.id == user_id).first()
+    db.query(models.RefreshToken).filter(models.RefreshToken.token_hash == token_hash).first()
+    (
+        db.query(models.ServiceApiKey)
+        .options(joinedload(models.ServiceApiKey.service))
+        .filter(models.ServiceApiKey.key_hash == key_hash)
+        .first()
+    )
+
+
+def _cached_lookups(db: Session, identifier: str, user_id, token_hash: str, key_hash: str) -> None:
+    crud.get_user_by_identifier(db, identifier)
+    crud.get_user_by_id(db, user_id)
+    db.execute(statements.REFRESH_TOKEN_BY_HASH, {"token_hash": token_hash}).scalars().first()
+    crud.get_service_api_key_by_hash(db, key_hash)
+
+
+def _measure(fn, db: Session, iterations: int) -> float:
+    args = ("nobody@example.com", uuid.uuid4(), "0" * 64, "0" * 64)
+    for _ in range(min(iterations, 200)):
+        fn(db, *args)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(db, *args)
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Per-call overhead of the hot crud lookups (4 queries per call)")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument(
+        "--database-url",
+        default="sqlite://",
+        help="Defaults to in-memory SQLite so the number is dominated by Python-side statement overhead",
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if args.database_url.startswith("sqlite"):
+        Base.metadata.create_all(engine, tables=TABLES)
+
+    with Session(engine) as db:
+        legacy_us = _measure(_legacy_lookups, db, args.iterations)
+        cached_us = _measure(_cached_lookups, db, args.iterations)
+
+    print(f"legacy_query_us_per_call= {legacy_us:.1f}")
+    print(f"cached_statement_us_per_call= {cached_us:.1f}")
+    print(f"speedup= {legacy_us / cached_us:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
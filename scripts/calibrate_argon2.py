@@ -0,0 +1,63 @@
+import argparse
+import os
+import statistics
+import time
+
+from passlib.hash import argon2
+
+PASSWORD = "calibration-Passw0rd!"
+
+
+def _measure(memory_cost: int, time_cost: int, parallelism: int, samples: int) -> float:
+    hasher = argon2.using(memory_cost=memory_cost, time_cost=time_cost, parallelism=parallelism)
+    hashed = hasher.hash(PASSWORD)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.verify(PASSWORD, hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Argon2 costs and suggest settings")
+    parser.add_argument("--target-ms", type=float, default=100.0, help="Target verify latency per hash")
+    parser.add_argument(
+        "--memory-cost",
+        type=int,
+        nargs="+",
+        default=[19456, 47104, 65536],
+        help="Memory costs to try, in KiB",
+    )
+    parser.add_argument("--parallelism", type=int, default=1, help="Argon2 lanes per hash")
+    parser.add_argument("--max-time-cost", type=int, default=10, help="Highest time cost to try")
+    parser.add_argument("--samples", type=int, default=5, help="Timed verifications per setting")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    best = None
+    print(f"{'memory_kib':>10} {'time_cost':>9} {'median_ms':>9} {'logins/s':>9}")
+    for memory_cost in sorted(args.memory_cost):
+        for time_cost in range(1, args.max_time_cost + 1):
+            median_ms = _measure(memory_cost, time_cost, args.parallelism, args.samples)
+            throughput = cores * 1000 / median_ms
+            print(f"{memory_cost:>10} {time_cost:>9} {median_ms:>9.1f} {throughput:>9.0f}")
+            if median_ms > args.target_ms:
+                break
+            best = (memory_cost, time_cost, median_ms, throughput)
+
+    if best is None:
+        print(f"No setting verified within {args.target_ms:.0f}ms; lower --memory-cost.")
+        return 1
+
+    memory_cost, time_cost, median_ms, throughput = best
+    print()
+    print(f"Suggested ({median_ms:.1f}ms per hash, ~{throughput:.0f} logins/s on {cores} cores):")
+    print(f"ARGON2_TIME_COST={time_cost}")
+    print(f"ARGON2_MEMORY_COST={memory_cost}")
+    print(f"ARGON2_PARALLELISM={args.parallelism}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -27,6 +27,7 @@ def main() -> int:
                 verification_method=args.verification_method,
             )
         api_key, db_key = crud.create_service_api_key(db, service.id)
+        db.commit()
     finally:
         db.close()
 
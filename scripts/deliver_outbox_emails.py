@@ -0,0 +1,25 @@
+import argparse
+
+from app import email_outbox
+from app.config import settings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Send due emails from the outbox once")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=settings.email_outbox_batch_size,
+        help="Emails claimed and sent per SMTP connection",
+    )
+    args = parser.parse_args()
+
+    totals = email_outbox.deliver(batch_size=args.batch_size)
+
+    for name, count in totals.items():
+        print(f"{name}=", count)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,46 @@
+import argparse
+import sys
+from datetime import datetime, timezone
+from uuid import UUID
+
+from app import exports
+
+
+def _parse_datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Stream auth events or users as NDJSON or CSV")
+    parser.add_argument("kind", choices=["events", "users"], help="What to export")
+    parser.add_argument("--format", default="ndjson", choices=sorted(exports.FORMATS), help="Output format")
+    parser.add_argument("--since", type=_parse_datetime, default=None, help="Only rows created at or after (ISO 8601)")
+    parser.add_argument("--until", type=_parse_datetime, default=None, help="Only rows created before (ISO 8601)")
+    parser.add_argument("--service-id", type=UUID, default=None, help="Only events of this service")
+    parser.add_argument("--output", default="-", help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    if args.service_id and args.kind != "events":
+        parser.error("--service-id only applies to events")
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        for chunk in exports.iter_export(
+            args.kind,
+            args.format,
+            since=args.since,
+            until=args.until,
+            service_id=args.service_id,
+        ):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
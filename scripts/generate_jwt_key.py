@@ -0,0 +1,68 @@
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+
+def _generate_private_key(algorithm: str):
+    if algorithm.startswith("RS"):
+        return rsa.generate_private_key(public_exponent=65537, key_size=3072)
+    curves = {"ES256": ec.SECP256R1(), "ES384": ec.SECP384R1(), "ES512": ec.SECP521R1()}
+    return ec.generate_private_key(curves[algorithm])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Generate a JWT signing key for JWT_KEYS_DIR")
+    parser.add_argument("--keys-dir", required=True, help="Directory holding <kid>.pem files")
+    parser.add_argument(
+        "--algorithm",
+        default="RS256",
+        choices=["RS256", "RS384", "RS512", "ES256", "ES384", "ES512"],
+        help="Signing algorithm (must match JWT_ALGORITHM)",
+    )
+    parser.add_argument("--kid", default=None, help="Key id (defaults to a timestamp)")
+    parser.add_argument(
+        "--retire",
+        default=None,
+        metavar="KID",
+        help="Replace an existing private key with its public key so it only verifies",
+    )
+    args = parser.parse_args()
+
+    keys_dir = Path(args.keys_dir)
+    keys_dir.mkdir(parents=True, exist_ok=True)
+
+    if args.retire:
+        path = keys_dir / f"{args.retire}.pem"
+        private_key = serialization.load_pem_private_key(path.read_bytes(), password=None)
+        path.write_bytes(
+            private_key.public_key().public_bytes(
+                serialization.Encoding.PEM,
+                serialization.PublicFormat.SubjectPublicKeyInfo,
+            )
+        )
+        print("retired_kid=", args.retire)
+        return 0
+
+    kid = args.kid or datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    path = keys_dir / f"{kid}.pem"
+    if path.exists():
+        raise SystemExit(f"Key already exists: {path}")
+    private_key = _generate_private_key(args.algorithm)
+    path.write_bytes(
+        private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    path.chmod(0o600)
+    print("kid=", kid)
+    print("path=", path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
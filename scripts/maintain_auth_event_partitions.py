@@ -0,0 +1,54 @@
+import argparse
+
+from app import partitions
+from app.config import settings
+from app.db import SessionLocal
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Create upcoming and prune expired auth_events partitions")
+    parser.add_argument(
+        "--months-ahead",
+        type=int,
+        default=settings.auth_event_partitions_ahead,
+        help="Monthly partitions to keep created ahead of the current month",
+    )
+    parser.add_argument(
+        "--retention-months",
+        type=int,
+        default=settings.auth_event_retention_months,
+        help="Partitions that ended more than this many months ago are pruned",
+    )
+    parser.add_argument(
+        "--detach-only",
+        action="store_true",
+        help="Detach expired partitions instead of dropping them (e.g. to archive first)",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only list existing partitions")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.dry_run:
+            for name in partitions.list_partitions(db):
+                print("partition=", name)
+            return 0
+        created = partitions.ensure_partitions(db, months_ahead=args.months_ahead)
+        pruned = partitions.prune_partitions(
+            db,
+            retention_months=args.retention_months,
+            detach_only=args.detach_only,
+        )
+    finally:
+        db.close()
+
+    for name in created:
+        print("created=", name)
+    action = "detached=" if args.detach_only else "dropped="
+    for name in pruned:
+        print(action, name)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
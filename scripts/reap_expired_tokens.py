@@ -0,0 +1,33 @@
+import argparse
+
+from app import token_reaper
+from app.config import settings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Delete expired and used refresh, verification and reset tokens and old outbox emails")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=settings.token_reaper_batch_size,
+        help="Rows deleted per transaction",
+    )
+    parser.add_argument(
+        "--sleep-ms",
+        type=int,
+        default=settings.token_reaper_batch_sleep_ms,
+        help="Pause between batches",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Count matching rows, then roll back")
+    args = parser.parse_args()
+
+    deleted = token_reaper.reap(batch_size=args.batch_size, sleep_ms=args.sleep_ms, dry_run=args.dry_run)
+
+    prefix = "would_delete_" if args.dry_run else "deleted_"
+    for name, count in deleted.items():
+        print(f"{prefix}{name}=", count)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
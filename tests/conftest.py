@@ -0,0 +1,110 @@
+import os
+from pathlib import Path
+
+import pytest
+
+# Settings are read when app.config is imported, so the environment is fixed up before any app import.
+# Every test truncates all tables: point TEST_DATABASE_URL at a throwaway database.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL or "postgresql+psycopg2://localhost/unused"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("READ_DATABASE_URL", None)
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.update(
+    {
+        "LOG_FILE": "",
+        "REGISTER_RATE_LIMIT": "1000/minute",
+        "TOKEN_RATE_LIMIT": "1000/minute",
+        "PASSWORD_HASH_WORKERS": "1",
+        "ARGON2_TIME_COST": "1",
+        "ARGON2_MEMORY_COST": "8",
+        "ARGON2_PARALLELISM": "1",
+        # Outbox tests point SMTP at their own sink and call email_outbox.deliver directly.
+        "SMTP_HOST": "",
+        "SMTP_USER": "",
+        "SMTP_PASSWORD": "",
+        "EMAIL_OUTBOX_WORKERS": "0",
+    }
+)
+
+ROOT = Path(__file__).resolve().parents[1]
+PASSWORD = "Secret-123"
+
+
+@pytest.fixture(scope="session")
+def database():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from alembic import command
+    from alembic.config import Config
+
+    from app import partitions
+
+    config = Config()
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    command.upgrade(config, "head")
+    partitions.ensure_current_partitions()
+
+
+@pytest.fixture
+def db(database):
+    from sqlalchemy import text
+
+    from app import service_auth, user_cache
+    from app.base import Base
+    from app.db import SessionLocal, engine
+
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    with engine.begin() as connection:
+        connection.execute(text(f"TRUNCATE {tables} CASCADE"))
+    user_cache._cache.clear()
+    service_auth._api_key_cache.clear()
+    service_auth._unknown_api_key_cache.clear()
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def create_user(db):
+    from app import crud, hashing, models, schemas
+
+    def _create_user(email=None, phone=None, password=PASSWORD, verified=True, legacy=False):
+        hashed_password = hashing.pwd_context.hash(password)
+        if legacy:
+            # Rows from before normalized keys existed: duplicates of an existing key keep NULL.
+            user = models.User(email=email, phone=phone, hashed_password=hashed_password, email_verified=verified)
+            db.add(user)
+            db.flush()
+        else:
+            user = crud.create_user(db, schemas.UserCreate(email=email, phone=phone, password=password), hashed_password)
+            user.email_verified = verified
+        db.commit()
+        return user
+
+    return _create_user
+
+
+@pytest.fixture
+def client(db):
+    from fastapi.testclient import TestClient
+
+    from app import crud
+    from app.main import app
+
+    service = crud.create_service(db, "test-service")
+    api_key, _ = crud.create_service_api_key(db, service.id)
+    db.commit()
+    with TestClient(app, headers={"X-API-Key": api_key}) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def login(client):
+    def _login(username: str, password: str = PASSWORD):
+        return client.post("/token", data={"username": username, "password": password})
+
+    return _login
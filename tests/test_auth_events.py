@@ -0,0 +1,75 @@
+import uuid
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from app import auth_events, models
+from app.background import PeriodicWorker
+
+
+@pytest.fixture
+def empty_queue():
+    auth_events._drain(auth_events._queue.maxsize)
+    yield
+    auth_events._drain(auth_events._queue.maxsize)
+
+
+def _stored_events(db) -> list[tuple]:
+    db.expire_all()
+    return db.execute(
+        select(models.AuthEvent.user_id, models.AuthEvent.event_type).order_by(models.AuthEvent.event_type)
+    ).all()
+
+
+def test_transient_failure_is_retried_and_only_the_rejected_event_is_dropped(db, create_user, empty_queue, monkeypatch):
+    user = create_user(email="user@example.com")
+    for index in range(3):
+        auth_events.record(user.id, f"login-{index}", "127.0.0.1", None)
+    # No such user: the foreign key rejects this row on every attempt.
+    auth_events.record(uuid.uuid4(), "login-orphan", "127.0.0.1", None)
+    for index in range(3, 6):
+        auth_events.record(user.id, f"login-{index}", "127.0.0.1", None)
+
+    insert = auth_events.crud.insert_auth_events
+    calls = []
+
+    def flaky_insert(session, events):
+        calls.append(len(events))
+        if len(calls) == 1:
+            raise OperationalError("INSERT INTO auth_events", {}, Exception("server closed the connection"))
+        return insert(session, events)
+
+    monkeypatch.setattr(auth_events.crud, "insert_auth_events", flaky_insert)
+    before = auth_events.stats()
+
+    with pytest.raises(OperationalError):
+        auth_events.flush()
+
+    assert auth_events._queue.qsize() == 7
+    assert auth_events.stats()["dead_lettered"] == before["dead_lettered"]
+    assert _stored_events(db) == []
+
+    assert auth_events.flush() == 6
+
+    assert _stored_events(db) == [(user.id, f"login-{index}") for index in range(6)]
+    after = auth_events.stats()
+    assert after["dead_lettered"] == before["dead_lettered"] + 1
+    assert after["written"] == before["written"] + 6
+    assert after["queue_depth"] == 0
+
+
+def test_worker_backs_off_exponentially_while_runs_fail():
+    outcomes = [False, False, False, False, True]
+
+    def run():
+        if not outcomes.pop(0):
+            raise RuntimeError("database unavailable")
+
+    worker = PeriodicWorker("test-worker", 1, run, max_backoff_seconds=5)
+    delays = []
+    for _ in range(5):
+        worker._call()
+        delays.append(worker.next_delay())
+
+    assert delays == [2, 4, 5, 5, 1]
@@ -0,0 +1,29 @@
+from sqlalchemy import create_engine, text
+
+from app import db_pool
+from app.config import settings
+
+
+def test_pool_stats_count_checkouts_and_pool_limit(database, monkeypatch):
+    monkeypatch.setattr(settings, "db_pool_size", 1)
+    monkeypatch.setattr(settings, "db_max_overflow", 1)
+    engine = create_engine(settings.database_url, **db_pool.engine_options())
+    db_pool.instrument(engine)
+    try:
+        with engine.connect() as first:
+            first.execute(text("SELECT 1"))
+            with engine.connect() as second:
+                second.execute(text("SELECT 1"))
+                during = db_pool.pool_stats(engine)
+        # Reuses the pooled connection instead of opening a third one.
+        with engine.connect() as third:
+            third.execute(text("SELECT 1"))
+        after = db_pool.pool_stats(engine)
+    finally:
+        engine.dispose()
+
+    assert during["checked_out"] == 2 and during["overflow"] == 1
+    assert during["checkouts"] == 2 and during["checkouts_at_limit"] == 1
+    assert after["checked_out"] == 0
+    assert after["checkouts"] == 3 and after["connects"] == 2
+    assert after["max_held_ms"] >= after["avg_held_ms"] > 0
@@ -0,0 +1,205 @@
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from aiosmtpd.controller import Controller
+from sqlalchemy import text
+
+from app import crud, email_outbox, models
+from app.config import settings
+from app.db import SessionLocal
+
+
+class _Sink:
+    def __init__(self):
+        self.messages = []
+        self.reply = "250 OK"
+        self._lock = threading.Lock()
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.reply.startswith("250"):
+            with self._lock:
+                self.messages.append(envelope)
+        return self.reply
+
+
+@pytest.fixture
+def smtp_sink(monkeypatch):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    sink = _Sink()
+    controller = Controller(sink, hostname="127.0.0.1", port=port)
+    controller.start()
+    monkeypatch.setattr(settings, "smtp_host", "127.0.0.1")
+    monkeypatch.setattr(settings, "smtp_port", port)
+    monkeypatch.setattr(settings, "smtp_starttls", False)
+    monkeypatch.setattr(settings, "smtp_from_email", "auth@example.com")
+    try:
+        yield sink
+    finally:
+        controller.stop()
+
+
+def _enqueue(db, count: int = 1) -> list:
+    rows = [crud.enqueue_email(db, f"user{index}@example.com", "Subject", "Body") for index in range(count)]
+    db.commit()
+    return rows
+
+
+def _outbox(db) -> list[models.EmailOutbox]:
+    db.expire_all()
+    return db.query(models.EmailOutbox).order_by(models.EmailOutbox.to_email).all()
+
+
+def _make_due(db) -> None:
+    db.execute(text("UPDATE email_outbox SET next_attempt_at = now() WHERE sent_at IS NULL AND failed_at IS NULL"))
+    db.commit()
+
+
+def test_forgot_password_email_is_delivered_from_outbox(db, client, create_user, smtp_sink):
+    create_user(email="user@example.com")
+
+    assert client.post("/password/forgot", json={"email": "user@example.com"}).status_code == 200
+
+    [row] = _outbox(db)
+    assert row.to_email == "user@example.com" and row.sent_at is None
+    assert not smtp_sink.messages
+
+    assert email_outbox.deliver() == {"sent": 1, "retried": 0, "failed": 0}
+
+    [envelope] = smtp_sink.messages
+    assert envelope.rcpt_tos == ["user@example.com"]
+    assert b"Subject: Reset your password" in envelope.content
+    [row] = _outbox(db)
+    assert row.sent_at is not None and row.attempts == 1
+    assert email_outbox.deliver()["sent"] == 0
+
+
+def test_batch_is_sent_over_one_connection(db, smtp_sink, monkeypatch):
+    connections = []
+    connect = email_outbox.email.connect
+
+    def counting_connect():
+        connections.append(1)
+        return connect()
+
+    monkeypatch.setattr(email_outbox.email, "connect", counting_connect)
+    _enqueue(db, 3)
+
+    assert email_outbox.deliver(batch_size=10)["sent"] == 3
+
+    assert len(smtp_sink.messages) == 3
+    assert len(connections) == 1
+
+
+def test_temporary_failure_is_retried_with_backoff(db, smtp_sink, monkeypatch):
+    monkeypatch.setattr(settings, "email_outbox_retry_base_seconds", 60)
+    _enqueue(db)
+    smtp_sink.reply = "451 Try again later"
+
+    started = datetime.now(timezone.utc)
+    assert email_outbox.deliver() == {"sent": 0, "retried": 1, "failed": 0}
+
+    [row] = _outbox(db)
+    assert row.attempts == 1 and row.sent_at is None and row.failed_at is None
+    assert "451" in row.last_error
+    assert started + timedelta(seconds=55) < row.next_attempt_at < started + timedelta(seconds=65)
+    # Not due yet.
+    assert email_outbox.deliver() == {"sent": 0, "retried": 0, "failed": 0}
+
+    _make_due(db)
+    started = datetime.now(timezone.utc)
+    assert email_outbox.deliver()["retried"] == 1
+    [row] = _outbox(db)
+    assert row.attempts == 2
+    assert started + timedelta(seconds=115) < row.next_attempt_at < started + timedelta(seconds=125)
+
+    smtp_sink.reply = "250 OK"
+    _make_due(db)
+    assert email_outbox.deliver()["sent"] == 1
+    [row] = _outbox(db)
+    assert row.sent_at is not None and row.attempts == 3
+
+
+def test_gives_up_after_max_attempts(db, smtp_sink, monkeypatch):
+    monkeypatch.setattr(settings, "email_outbox_max_attempts", 3)
+    _enqueue(db)
+    smtp_sink.reply = "451 Try again later"
+
+    results = []
+    for _ in range(3):
+        results.append(email_outbox.deliver())
+        _make_due(db)
+
+    assert [result["retried"] for result in results] == [1, 1, 0]
+    assert results[-1]["failed"] == 1
+    [row] = _outbox(db)
+    assert row.attempts == 3 and row.failed_at is not None and row.sent_at is None
+    assert email_outbox.deliver() == {"sent": 0, "retried": 0, "failed": 0}
+
+
+def test_permanent_rejection_is_not_retried(db, smtp_sink):
+    _enqueue(db)
+    smtp_sink.reply = "550 Mailbox unavailable"
+
+    assert email_outbox.deliver() == {"sent": 0, "retried": 0, "failed": 1}
+
+    [row] = _outbox(db)
+    assert row.attempts == 1 and row.failed_at is not None
+
+
+def test_unreachable_server_keeps_rows_for_retry(db, smtp_sink, monkeypatch):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        closed_port = probe.getsockname()[1]
+    monkeypatch.setattr(settings, "smtp_port", closed_port)
+    _enqueue(db, 2)
+
+    assert email_outbox.deliver() == {"sent": 0, "retried": 2, "failed": 0}
+
+    assert all(row.failed_at is None and row.attempts == 1 for row in _outbox(db))
+
+
+def test_concurrent_claims_never_overlap(db):
+    _enqueue(db, 5)
+    first, second = SessionLocal(), SessionLocal()
+    try:
+        # The first claim stays uncommitted, so its rows are still locked when the second one runs.
+        claimed_first = {row.id for row in crud.claim_outbox_emails(first, 3, 300)}
+        claimed_second = {row.id for row in crud.claim_outbox_emails(second, 10, 300)}
+        first.commit()
+        second.commit()
+        # Once committed the lease keeps them out of later claims.
+        claimed_again = crud.claim_outbox_emails(second, 10, 300)
+        second.commit()
+    finally:
+        first.close()
+        second.close()
+
+    assert len(claimed_first) == 3 and len(claimed_second) == 2
+    assert not claimed_first & claimed_second
+    assert claimed_again == []
+
+
+def test_parallel_workers_send_each_email_once(db, smtp_sink):
+    _enqueue(db, 20)
+    barrier = threading.Barrier(4)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(email_outbox.deliver(batch_size=3))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(result["sent"] for result in results) == 20
+    assert sorted(envelope.rcpt_tos[0] for envelope in smtp_sink.messages) == sorted(
+        f"user{index}@example.com" for index in range(20)
+    )
+    assert all(row.sent_at is not None and row.attempts == 1 for row in _outbox(db))
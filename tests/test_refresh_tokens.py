@@ -0,0 +1,67 @@
+import threading
+
+from app import models
+from app.auth import hash_refresh_token
+
+
+def _refresh(client, refresh_token: str):
+    return client.post("/token/refresh", json={"refresh_token": refresh_token})
+
+
+def _stored(db, refresh_token: str) -> models.RefreshToken:
+    db.expire_all()
+    return db.query(models.RefreshToken).filter_by(token_hash=hash_refresh_token(refresh_token)).one()
+
+
+def test_refresh_rotates_within_family(db, client, create_user, login):
+    create_user(email="user@example.com")
+    first = login("user@example.com").json()
+
+    response = _refresh(client, first["refresh_token"])
+
+    assert response.status_code == 200
+    second = response.json()
+    assert second["refresh_token"] != first["refresh_token"]
+    me = client.get("/users/me", headers={"Authorization": f"Bearer {second['access_token']}"})
+    assert me.status_code == 200
+    old, new = _stored(db, first["refresh_token"]), _stored(db, second["refresh_token"])
+    assert old.revoked and not new.revoked
+    assert old.family_id == new.family_id
+
+
+def test_concurrent_refreshes_of_one_token_issue_one_pair(client, create_user, login):
+    create_user(email="user@example.com")
+    refresh_token = login("user@example.com").json()["refresh_token"]
+    barrier = threading.Barrier(2)
+    statuses = []
+
+    def refresh():
+        barrier.wait()
+        statuses.append(_refresh(client, refresh_token).status_code)
+
+    threads = [threading.Thread(target=refresh) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [200, 401]
+
+
+def test_reused_refresh_token_revokes_family(db, client, create_user, login):
+    create_user(email="user@example.com")
+    first = login("user@example.com").json()["refresh_token"]
+    second = _refresh(client, first).json()["refresh_token"]
+    other_login = login("user@example.com").json()["refresh_token"]
+
+    assert _refresh(client, first).status_code == 401
+
+    assert _stored(db, second).revoked
+    assert _refresh(client, second).status_code == 401
+    # A separate login is a separate family and survives.
+    assert not _stored(db, other_login).revoked
+    assert _refresh(client, other_login).status_code == 200
+
+
+def test_unknown_refresh_token_is_rejected(client):
+    assert _refresh(client, "not-a-token").status_code == 401
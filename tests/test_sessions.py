@@ -0,0 +1,65 @@
+from sqlalchemy import text
+
+from app import crud
+
+
+def _bearer(access_token: str) -> dict:
+    return {"Authorization": f"Bearer {access_token}"}
+
+
+def _refresh(client, refresh_token: str):
+    return client.post("/token/refresh", json={"refresh_token": refresh_token})
+
+
+def test_logout_all_ends_every_session(client, create_user, login):
+    create_user(email="user@example.com")
+    first = login("user@example.com").json()
+    second = login("user@example.com").json()
+    assert client.get("/users/me", headers=_bearer(second["access_token"])).status_code == 200
+
+    response = client.post("/logout/all", headers=_bearer(first["access_token"]))
+
+    assert response.status_code == 200
+    for pair in (first, second):
+        assert client.get("/users/me", headers=_bearer(pair["access_token"])).status_code == 401
+        assert _refresh(client, pair["refresh_token"]).status_code == 401
+    introspection = client.post("/token/introspect", json={"tokens": [first["access_token"]]}).json()
+    assert [result["active"] for result in introspection["results"]] == [False]
+
+    fresh = login("user@example.com").json()
+    assert client.get("/users/me", headers=_bearer(fresh["access_token"])).status_code == 200
+    assert _refresh(client, fresh["refresh_token"]).status_code == 200
+
+
+def test_logout_all_requires_access_token(client):
+    assert client.post("/logout/all").status_code == 401
+
+
+def test_password_reset_ends_every_session(db, client, create_user, login):
+    user = create_user(email="user@example.com")
+    before = login("user@example.com").json()
+    reset_token, _ = crud.create_password_reset_token(db, user.id)
+    db.commit()
+
+    response = client.post("/password/reset", json={"token": reset_token, "password": "Changed-456"})
+
+    assert response.status_code == 200
+    assert client.get("/users/me", headers=_bearer(before["access_token"])).status_code == 401
+    assert _refresh(client, before["refresh_token"]).status_code == 401
+    assert login("user@example.com").status_code == 401
+    after = login("user@example.com", "Changed-456").json()
+    assert client.get("/users/me", headers=_bearer(after["access_token"])).status_code == 200
+
+
+def test_newer_generation_than_cached_reloads_user(db, client, create_user, login):
+    create_user(email="user@example.com")
+    before = login("user@example.com").json()
+    assert client.get("/users/me", headers=_bearer(before["access_token"])).status_code == 200
+    # Bumped by another process: this one's user cache still holds generation 0.
+    db.execute(text("UPDATE users SET token_generation = token_generation + 1"))
+    db.commit()
+
+    after = login("user@example.com").json()
+
+    assert client.get("/users/me", headers=_bearer(after["access_token"])).status_code == 200
+    assert client.get("/users/me", headers=_bearer(before["access_token"])).status_code == 401
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta, timezone
+
+from app import crud, models, token_reaper
+from app.db import SessionLocal
+
+
+def _expired_refresh_tokens(db, user, count: int) -> tuple[list, models.RefreshToken]:
+    expired = datetime.now(timezone.utc) - timedelta(days=30)
+    tokens = []
+    for _ in range(count):
+        _, db_token = crud.create_refresh_token(db, user.id)
+        db_token.expires_at = expired
+        tokens.append(db_token)
+    _, live = crud.create_refresh_token(db, user.id)
+    db.commit()
+    return tokens, live
+
+
+def _remaining_ids(db) -> set:
+    db.expire_all()
+    return {token_id for (token_id,) in db.query(models.RefreshToken.id)}
+
+
+def test_reap_deletes_expired_tokens_in_batches(db, create_user):
+    _, live = _expired_refresh_tokens(db, create_user(email="user@example.com"), 5)
+
+    deleted = token_reaper.reap(batch_size=2, sleep_ms=0)
+
+    assert deleted["refresh_tokens"] == 5
+    assert _remaining_ids(db) == {live.id}
+
+
+def test_reap_skips_locked_rows_and_keeps_going(db, create_user):
+    tokens, live = _expired_refresh_tokens(db, create_user(email="user@example.com"), 5)
+    locked_id = sorted(token.id for token in tokens)[1]
+    locker = SessionLocal()
+    try:
+        locker.execute(models.RefreshToken.__table__.select().where(models.RefreshToken.id == locked_id).with_for_update())
+
+        deleted = token_reaper.reap(batch_size=2, sleep_ms=0)
+
+        assert deleted["refresh_tokens"] == 4
+    finally:
+        locker.rollback()
+        locker.close()
+    assert token_reaper.reap(batch_size=2, sleep_ms=0)["refresh_tokens"] == 1
+    assert _remaining_ids(db) == {live.id}
+
+
+def test_reap_dry_run_keeps_rows(db, create_user):
+    tokens, live = _expired_refresh_tokens(db, create_user(email="user@example.com"), 3)
+
+    assert token_reaper.reap(batch_size=2, sleep_ms=0, dry_run=True)["refresh_tokens"] == 3
+    assert _remaining_ids(db) == {token.id for token in [*tokens, live]}
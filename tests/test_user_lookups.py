@@ -0,0 +1,29 @@
+from app import crud
+
+
+def test_exact_spelling_wins_over_normalized_key(db, create_user):
+    older = create_user(email="foo@example.com", password="Older-123")
+    newer = create_user(email="Foo@example.com", password="Newer-123", legacy=True)
+    assert newer.email_normalized is None
+
+    assert crud.get_user_by_email(db, "foo@example.com").id == older.id
+    assert crud.get_user_by_email(db, "Foo@example.com").id == newer.id
+    # Any other spelling resolves through the normalized key.
+    assert crud.get_user_by_email(db, "FOO@example.com").id == older.id
+
+
+def test_login_reaches_newer_case_duplicate(create_user, login):
+    create_user(email="foo@example.com", password="Older-123")
+    create_user(email="Foo@example.com", password="Newer-123", legacy=True)
+
+    assert login("Foo@example.com", "Newer-123").status_code == 200
+    assert login("foo@example.com", "Older-123").status_code == 200
+    assert login("Foo@example.com", "Older-123").status_code == 401
+
+
+def test_phone_lookup_by_exact_and_e164(db, create_user):
+    user = create_user(phone="+90 555 123 45 67")
+
+    assert crud.get_user_by_phone(db, "+90 555 123 45 67").id == user.id
+    assert crud.get_user_by_phone(db, "0090-555-123-4567").id == user.id
+    assert crud.get_user_by_phone(db, "+905551234568") is None